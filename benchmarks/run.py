@@ -0,0 +1,208 @@
+"""
+LanZouCloud API 的离线基准测试
+
+启动 server.py 作为蓝奏云的替身(独立进程，不占用被测进程的 CPU 时间)，
+LanZouCloud 的全部请求经 LocalAdapter 转发到替身服务器，依次运行各个流程，
+统计每个流程的请求数、每次操作的请求数、耗时、CPU 时间与吞吐量。
+
+    python benchmarks/run.py                          # 运行全部流程
+    python benchmarks/run.py list resolve -v          # 只运行部分流程，并列出各接口的请求数
+    python benchmarks/run.py --save base.json         # 保存结果
+    python benchmarks/run.py --compare base.json      # 与保存的结果比较，每次操作的请求数增加时返回 1
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from time import perf_counter, process_time
+from urllib.parse import urlsplit, urlunsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from lanzou.api import LanZouCloud  # noqa: E402
+
+HOST = 'https://pan.lanzouo.com'
+
+
+class LocalAdapter(HTTPAdapter):
+    """把所有请求转发到本地替身服务器，原始域名放在 X-Bench-Host 请求头中"""
+
+    def __init__(self, port, **kwargs):
+        self._netloc = f'127.0.0.1:{port}'
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        url = urlsplit(request.url)
+        request.headers['X-Bench-Host'] = url.netloc
+        request.url = urlunsplit(('http', self._netloc, url.path, url.query, ''))
+        return super().send(request, **kwargs)
+
+
+class Task:
+    """与 gui 中 DJob/UpJob 相同的进度属性"""
+
+    def __init__(self, url='', path='', pwd=''):
+        self.url, self.path, self.pwd = url, path, pwd
+        self.now_size = self.total_size = self.current = self.total_file = 0
+        self.info = self.size = None
+        self.rate = 0
+
+
+class Bench:
+    def __init__(self, args):
+        self.args = args
+        cmd = [sys.executable, os.path.join(ROOT, 'benchmarks', 'server.py'), '--latency', str(args.latency),
+               '--bandwidth', str(args.bandwidth), '--files', str(args.files), '--file-size', str(args.file_size)]
+        self.server = subprocess.Popen(cmd, stdout=subprocess.PIPE, text=True)
+        port, big_folder = self.server.stdout.readline().split()
+        self.port, self.big_folder = int(port), int(big_folder)
+        self.control = f'http://127.0.0.1:{self.port}'
+        self.tmp = tempfile.mkdtemp(prefix='lanzou-bench-')
+
+    def close(self):
+        self.server.terminate()
+        self.server.wait()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def client(self) -> LanZouCloud:
+        """每个流程使用新的客户端，缓存与连接池互不影响"""
+        lzy = LanZouCloud()
+        if self.args.no_rate_limit:
+            lzy.set_rate_limit('control', 0)
+            lzy.set_rate_limit('transfer', 0)
+        for prefix in ('https://', 'http://'):
+            lzy._session.mount(prefix, LocalAdapter(self.port, pool_connections=32, pool_maxsize=32))
+        return lzy
+
+    def local_file(self, name, size):
+        path = os.path.join(self.tmp, name)
+        with open(path, 'wb') as f:
+            f.write(os.urandom(size))
+        return path
+
+    # 各个流程，返回 (操作次数, 传输的字节数)
+    def flow_list(self, lzy):
+        files = lzy.get_file_list(-1)
+        lzy.get_dir_list(-1)
+        assert len(files) == self.args.files, len(files)
+        return 1, 0
+
+    def flow_resolve(self, lzy):
+        count = min(self.args.count * 5, self.args.files)
+        for fid in range(1, count + 1):
+            info = lzy.get_durl_by_id(fid)
+            assert info.code == LanZouCloud.SUCCESS, info
+        return count, 0
+
+    def flow_download(self, lzy):
+        path = os.path.join(self.tmp, 'download')
+        total = 0
+        for fid in range(1, self.args.count + 1):
+            task = Task(f'{HOST}/i{fid:07d}', path)
+            code = lzy.down_file_by_url(task.url, task, lambda: None)
+            assert code == LanZouCloud.SUCCESS, code
+            total += task.now_size
+        return self.args.count, total
+
+    def flow_upload(self, lzy):
+        size = self.args.file_size * 1024
+        total = 0
+        for i in range(self.args.count):
+            task = Task()
+            code, _, _ = lzy.upload_file(task, self.local_file(f'up{i}.zip', size), -1)
+            assert code == LanZouCloud.SUCCESS, code
+            total += size
+        return self.args.count, total
+
+    def flow_bigfile_up(self, lzy):
+        lzy.set_max_size(1)  # 每个数据块 1MB
+        size = self.args.file_size * 1024 * 4 - 123
+        task = Task()
+        code, _, _ = lzy.upload_file(task, self.local_file('bigup.iso', size), -1, allow_big_file=True)
+        assert code == LanZouCloud.SUCCESS, code
+        return 1, size
+
+    def flow_bigfile_down(self, lzy):
+        task = Task(f'{HOST}/b{self.big_folder:07d}', os.path.join(self.tmp, 'bigdown'))
+        code = lzy.down_dir_by_url(task, lambda: None)
+        assert code == LanZouCloud.SUCCESS, code
+        return 1, task.now_size
+
+    FLOWS = ['list', 'resolve', 'download', 'upload', 'bigfile_up', 'bigfile_down']
+
+    def run(self, name) -> dict:
+        lzy = self.client()
+        requests.post(self.control + '/__reset')
+        wall, cpu = perf_counter(), process_time()
+        ops, size = getattr(self, 'flow_' + name)(lzy)
+        wall, cpu = perf_counter() - wall, process_time() - cpu
+        stats = requests.get(self.control + '/__stats').json()
+        endpoints = {k: v for k, v in stats.items() if not k.startswith('bytes_')}
+        total = sum(endpoints.values())
+        return {'flow': name, 'ops': ops, 'requests': total, 'req_per_op': round(total / ops, 2),
+                'wall': round(wall, 3), 'cpu': round(cpu, 3), 'ops_per_s': round(ops / wall, 2),
+                'mb_per_s': round(size / 1048576 / wall, 2) if size else None, 'endpoints': endpoints}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='LanZouCloud API 离线基准测试')
+    parser.add_argument('flows', nargs='*', help=f"要运行的流程，默认全部: {' '.join(Bench.FLOWS)}")
+    parser.add_argument('--latency', type=float, default=30, help='每个请求的延迟(毫秒)')
+    parser.add_argument('--bandwidth', type=float, default=5120, help='每个连接的带宽(KB/s)，0 不限速')
+    parser.add_argument('--files', type=int, default=200, help='网盘根目录的文件数')
+    parser.add_argument('--file-size', type=int, default=4096, help='上传下载的文件大小(KB)')
+    parser.add_argument('--count', type=int, default=3, help='上传下载的文件数')
+    parser.add_argument('--no-rate-limit', action='store_true', help='关闭客户端的请求速率限制')
+    parser.add_argument('--save', help='结果保存为 json')
+    parser.add_argument('--compare', help='与保存的 json 结果比较')
+    parser.add_argument('-v', '--verbose', action='store_true', help='列出各接口的请求数')
+    args = parser.parse_args()
+    unknown = set(args.flows) - set(Bench.FLOWS)
+    if unknown:
+        parser.error(f"未知的流程: {' '.join(unknown)}")
+
+    bench = Bench(args)
+    results = []
+    try:
+        print(f"{'flow':<14}{'ops':>5}{'requests':>10}{'req/op':>8}{'wall(s)':>9}{'cpu(s)':>8}{'ops/s':>8}{'MB/s':>7}")
+        for name in args.flows or Bench.FLOWS:
+            r = bench.run(name)
+            results.append(r)
+            print(f"{name:<14}{r['ops']:>5}{r['requests']:>10}{r['req_per_op']:>8}{r['wall']:>9}{r['cpu']:>8}"
+                  f"{r['ops_per_s']:>8}{r['mb_per_s'] or '-':>7}")
+            if args.verbose:
+                for endpoint, count in sorted(r['endpoints'].items()):
+                    print(f"    {endpoint:<24}{count:>6}")
+    finally:
+        bench.close()
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            base = {r['flow']: r for r in json.load(f)}
+        regressed = False
+        for r in results:
+            if r['flow'] not in base:
+                continue
+            old = base[r['flow']]
+            flag = ''
+            if r['req_per_op'] > old['req_per_op']:
+                flag, regressed = '  <- 请求数增加', True
+            print(f"{r['flow']:<14}req/op {old['req_per_op']} -> {r['req_per_op']}, "
+                  f"wall {old['wall']} -> {r['wall']}, cpu {old['cpu']} -> {r['cpu']}{flag}")
+        return 1 if regressed else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,292 @@
+"""
+蓝奏云的本地替身服务器，回放 fixtures 中录制的页面与接口响应，用于离线基准测试
+
+所有域名的请求都由 run.py 中的 LocalAdapter 转发到这里，原始域名放在 X-Bench-Host 请求头中。
+每个请求先等待 latency 毫秒再响应，请求体与响应体按每个连接 bandwidth KB/s 的速度收发。
+
+单独运行: python benchmarks/server.py --latency 30 --bandwidth 5120
+启动后第一行输出监听的端口
+"""
+
+import argparse
+import json
+import os
+import pickle
+import random
+import re
+import sys
+from collections import Counter
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from threading import Lock
+from time import sleep
+from urllib.parse import parse_qs, urlsplit
+
+FIXTURES = os.path.dirname(os.path.abspath(__file__)) + os.sep + 'fixtures'
+HOST = 'https://pan.lanzouo.com'
+DL_HOST = 'https://develope.lanzoug.com'
+PAGE_SIZE = 18  # 文件列表每页的文件数
+CHUNK = 64 * 1024
+
+
+def _fixture(name):
+    with open(FIXTURES + os.sep + name, encoding='utf-8') as f:
+        return f.read()
+
+
+def _size_str(size):
+    if size >= 1048576:
+        return f'{size / 1048576:.1f} M'
+    return f'{size / 1024:.1f} K'
+
+
+class Disk:
+    """网盘中的文件与文件夹"""
+
+    def __init__(self, files=200, file_size=4 * 1048576, big_parts=4):
+        self.lock = Lock()
+        self.files = {}  # {id: {'name', 'size', 'folder', 'data'(可选)}}
+        self.folders = {-1: {'name': 'LanZouCloud', 'parent': 0}}
+        self.next_id = 1
+        for i in range(files):
+            self.add_file(f'file{i:04d}.zip', file_size, -1)
+        # 大文件的分段数据与记录文件，放在一个分享文件夹里
+        self.big_folder = self.add_folder('big.iso', -1)
+        parts = []
+        for i in range(big_parts):
+            parts.append(f'{i:03d}{random.Random(i).randint(10 ** 8, 10 ** 9)}.zip')
+            self.add_file(parts[-1], file_size, self.big_folder)
+        record = pickle.dumps({'name': 'big.iso', 'size': file_size * big_parts, 'uploaded': file_size * big_parts,
+                               'parts': parts}, protocol=4)
+        fid = self.add_file('bigisorecord.txt', len(record), self.big_folder)
+        self.files[fid]['data'] = record
+
+    def add_file(self, name, size, folder):
+        with self.lock:
+            fid = self.next_id
+            self.next_id += 1
+            self.files[fid] = {'name': name, 'size': size, 'folder': folder}
+        return fid
+
+    def add_folder(self, name, parent):
+        with self.lock:
+            fid = 10000 + len(self.folders)
+            self.folders[fid] = {'name': name, 'parent': parent}
+        return fid
+
+    def folder_files(self, folder):
+        return [(fid, f) for fid, f in sorted(self.files.items(), reverse=True) if f['folder'] == folder]
+
+    def data(self, fid):
+        f = self.files[fid]
+        if 'data' not in f:
+            f['data'] = random.Random(fid).randbytes(f['size'])
+        return f['data']
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disk: Disk = None
+    latency = 0.0  # 秒
+    bandwidth = 0  # 字节/秒，0 不限速
+    stats = Counter()
+    stats_lock = Lock()
+
+    def log_message(self, *args):
+        pass
+
+    def _count(self, key, n=1):
+        with self.stats_lock:
+            self.stats[key] += n
+
+    def _read_body(self) -> bytes:
+        size = int(self.headers.get('Content-Length', 0))
+        chunks = []
+        while size > 0:
+            chunk = self.rfile.read(min(CHUNK, size))
+            if not chunk:
+                break
+            chunks.append(chunk)
+            size -= len(chunk)
+            if self.bandwidth:
+                sleep(len(chunk) / self.bandwidth)
+        body = b''.join(chunks)
+        self._count('bytes_in', len(body))
+        return body
+
+    def _send(self, body, status=200, content_type='text/html; charset=utf-8', headers=None):
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        if self.command == 'HEAD':
+            return None
+        try:
+            for i in range(0, len(body), CHUNK):
+                self.wfile.write(body[i:i + CHUNK])
+                if self.bandwidth:
+                    sleep(min(CHUNK, len(body) - i) / self.bandwidth)
+        except (BrokenPipeError, ConnectionResetError):
+            return None
+        self._count('bytes_out', len(body))
+
+    def _json(self, data):
+        self._send(json.dumps(data, ensure_ascii=False), content_type='application/json')
+
+    def do_HEAD(self):
+        sleep(self.latency)
+        self._count('probe')
+        self._send(b'')
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path == '/__stats':
+            with self.stats_lock:
+                return self._json(dict(self.stats))
+        sleep(self.latency)
+        if re.fullmatch(r'/i\d+', url.path):
+            return self._share_page(int(url.path[2:]))
+        if url.path == '/fn':
+            return self._down_page(url.query)
+        if url.path.startswith('/file/'):
+            self._count('file_redirect')
+            return self._send(b'', 302, headers={'Location': f'{DL_HOST}/data/{url.path[6:]}'})
+        if url.path.startswith('/data/'):
+            return self._data(int(url.path[6:]))
+        if re.fullmatch(r'/b\d+', url.path):
+            return self._folder_page(int(url.path[2:]))
+        self._count('not_found')
+        self._send('', 404)
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        if url.path == '/__reset':
+            with self.stats_lock:
+                self.stats.clear()
+            self._read_body()
+            return self._json({'zt': 1})
+        sleep(self.latency)
+        body = self._read_body()
+        if url.path == '/fileup.php':
+            return self._upload(body)
+        form = {k: v[0] for k, v in parse_qs(body.decode('utf-8')).items()}
+        if url.path == '/doupload.php':
+            self._count(f"doupload.task{form.get('task')}")
+            return self._doupload(form)
+        if url.path == '/ajaxm.php':
+            self._count('ajaxm')
+            fid = int(form['sign'][4:].rstrip('x'))
+            return self._json({'zt': 1, 'dom': DL_HOST, 'url': str(fid), 'inf': self.disk.files[fid]['name']})
+        if url.path == '/filemoreajax.php':
+            return self._more(form)
+        self._count('not_found')
+        self._send('', 404)
+
+    def _doupload(self, form):
+        task, disk = int(form.get('task', 0)), self.disk
+        if task == 5:  # 文件列表
+            page = int(form['pg'])
+            files = disk.folder_files(int(form['folder_id']))[(page - 1) * PAGE_SIZE:page * PAGE_SIZE]
+            text = [{'id': str(fid), 'name_all': f['name'], 'time': '2020-11-08', 'size': _size_str(f['size']),
+                     'downs': '0', 'onof': '0', 'is_des': '0'} for fid, f in files]
+            return self._json({'zt': 1, 'info': 1 if text else 0, 'text': text})
+        if task == 47:  # 子文件夹与路径
+            folder_id = int(form['folder_id'])
+            text = [{'fol_id': str(fid), 'name': f['name'], 'onof': '0', 'folder_des': '[]'}
+                    for fid, f in disk.folders.items() if f['parent'] == folder_id]
+            return self._json({'zt': 1, 'text': text, 'info': []})
+        if task == 19:  # 全部文件夹
+            info = [{'folder_id': str(fid), 'folder_name': f['name']} for fid, f in disk.folders.items() if fid > 0]
+            return self._json({'zt': 1, 'info': info})
+        if task == 22:  # 文件分享信息
+            fid = int(form['file_id'])
+            return self._json({'zt': 1, 'info': {'pwd': 'abcd', 'onof': '0', 'f_id': f'i{fid:07d}', 'is_newd': HOST}})
+        if task == 12:  # 文件名与描述
+            fid = int(form['file_id'])
+            return self._json({'zt': 1, 'text': disk.files[fid]['name'].rsplit('.', 1)[0], 'info': ''})
+        if task == 18:  # 文件夹分享信息
+            fid = int(form['folder_id'])
+            return self._json({'zt': 1, 'info': {'name': disk.folders[fid]['name'], 'des': '', 'pwd': 'abcd',
+                                                 'onof': '0', 'new_url': f'{HOST}/b{fid:07d}'}})
+        if task == 2:  # 创建文件夹
+            disk.add_folder(form['folder_name'], int(form['parent_id']))
+            return self._json({'zt': 1, 'info': '创建成功'})
+        # 设置提取码、删除等操作
+        return self._json({'zt': 1, 'info': '成功'})
+
+    def _share_page(self, fid):
+        self._count('share_page')
+        f = self.disk.files.get(fid)
+        if f is None:
+            return self._send('<div class="off">文件取消分享了</div>')
+        filler = '\n'.join(f'<div class="c{i}"><a href="/u/x{i}">推荐 {i}</a></div>' for i in range(200))
+        self._send(_fixture('file_share.html').format(name=f['name'], size=_size_str(f['size']), time='2020-11-08',
+                                                       desc='bench', ifr=fid, sign=f'sign{fid}', filler=filler))
+
+    def _down_page(self, query):
+        self._count('down_page')
+        self._send(_fixture('down_page.html').format(sign=query + 'x' * 40))
+
+    def _data(self, fid):
+        self._count('data')
+        data = self.disk.data(fid)
+        rng = self.headers.get('Range')
+        if not rng:
+            return self._send(data, content_type='application/octet-stream', headers={'Accept-Ranges': 'bytes'})
+        start, end = re.match(r'bytes=(\d+)-(\d*)', rng).groups()
+        start, end = int(start), int(end) if end else len(data) - 1
+        if start >= len(data):
+            return self._send(b'', 416)
+        self._send(data[start:end + 1], 206, content_type='application/octet-stream',
+                   headers={'Accept-Ranges': 'bytes', 'Content-Range': f'bytes {start}-{end}/{len(data)}'})
+
+    def _folder_page(self, fid):
+        self._count('folder_page')
+        folder = self.disk.folders[fid]
+        self._send(_fixture('folder_share.html').format(name=folder['name'], desc='bench', fid=fid))
+
+    def _more(self, form):
+        self._count('filemoreajax')
+        page = int(form['pg'])
+        files = self.disk.folder_files(int(form['fid']))[(page - 1) * PAGE_SIZE:page * PAGE_SIZE]
+        if not files:
+            return self._json({'zt': 2, 'info': '没有了', 'text': []})
+        text = [{'id': f'i{fid:07d}', 'name_all': f['name'], 'time': '2020-11-08', 'size': _size_str(f['size'])}
+                for fid, f in files]
+        return self._json({'zt': 1, 'info': '成功', 'text': text})
+
+    def _upload(self, body):
+        self._count('fileup')
+        head = body[:4096].decode('utf-8', 'ignore')
+        name = re.search(r'name="name"\r\n\r\n(.*?)\r\n', head).group(1)
+        folder = int(re.search(r'name="folder_id"\r\n\r\n(.*?)\r\n', head).group(1))
+        fid = self.disk.add_file(name, len(body), folder)
+        self._json({'zt': 1, 'info': '上传成功', 'text': [{'id': str(fid), 'f_id': f'i{fid:07d}'}]})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--port', type=int, default=0)
+    parser.add_argument('--latency', type=float, default=30, help='每个请求的延迟(毫秒)')
+    parser.add_argument('--bandwidth', type=float, default=5120, help='每个连接的带宽(KB/s)，0 不限速')
+    parser.add_argument('--files', type=int, default=200, help='网盘根目录的文件数')
+    parser.add_argument('--file-size', type=int, default=4096, help='每个文件的大小(KB)')
+    args = parser.parse_args()
+
+    Handler.disk = Disk(args.files, args.file_size * 1024)
+    Handler.latency = args.latency / 1000
+    Handler.bandwidth = int(args.bandwidth * 1024)
+    server = ThreadingHTTPServer(('127.0.0.1', args.port), Handler)
+    server.daemon_threads = True
+    print(server.server_address[1], Handler.disk.big_folder, flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    sys.exit(main())
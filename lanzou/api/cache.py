@@ -0,0 +1,141 @@
+"""
+网盘文件(夹)列表的本地缓存(sqlite)，以及下载直链的内存缓存
+"""
+
+import pickle
+import sqlite3
+from threading import Lock
+from time import time
+
+from lanzou.debug import logger
+
+
+__all__ = ['ListCache', 'DurlCache']
+
+
+class ListCache:
+    """文件(夹)列表缓存
+    lists 表保存文件夹的文件列表(kind='file')与子文件夹列表及路径(kind='dir')
+    items 表记录文件(夹)所在的文件夹 id，修改文件(夹)时只清除受影响的文件夹缓存
+    """
+
+    def __init__(self, db_file, ttl=86400):
+        self._ttl = ttl  # 缓存有效期(秒)，过期的缓存不再返回
+        self._owner = None  # 当前用户，未登录时不读写缓存
+        self._lock = Lock()
+        self._db = sqlite3.connect(db_file, check_same_thread=False)
+        with self._lock, self._db:
+            self._db.execute("CREATE TABLE IF NOT EXISTS lists (owner TEXT, kind TEXT, folder_id INTEGER, "
+                             "data BLOB, updated REAL, PRIMARY KEY (owner, kind, folder_id))")
+            self._db.execute("CREATE TABLE IF NOT EXISTS items (owner TEXT, is_file INTEGER, item_id INTEGER, "
+                             "folder_id INTEGER, PRIMARY KEY (owner, is_file, item_id))")
+
+    def set_owner(self, owner):
+        """切换用户，owner 为 None 时停用缓存"""
+        self._owner = owner
+
+    def set_ttl(self, ttl):
+        self._ttl = ttl
+
+    def get(self, kind, folder_id):
+        """读取缓存，不存在或者已过期返回 None"""
+        if not self._owner:
+            return None
+        with self._lock:
+            row = self._db.execute("SELECT data, updated FROM lists WHERE owner=? AND kind=? AND folder_id=?",
+                                   (self._owner, kind, folder_id)).fetchone()
+        if not row or row[1] + self._ttl < time():
+            return None
+        try:
+            return pickle.loads(row[0])
+        except Exception as e:  # 旧版本的数据可能无法反序列化
+            logger.debug(f"Load cache error: e={e}")
+            return None
+
+    def put(self, kind, folder_id, data, item_ids):
+        """保存文件夹 folder_id 的列表，item_ids 为列表中文件(kind='file')或子文件夹的 id"""
+        if not self._owner:
+            return None
+        is_file = int(kind == 'file')
+        with self._lock, self._db:
+            self._db.execute("REPLACE INTO lists VALUES (?, ?, ?, ?, ?)",
+                             (self._owner, kind, folder_id, pickle.dumps(data), time()))
+            self._db.execute("DELETE FROM items WHERE owner=? AND is_file=? AND folder_id=?",
+                             (self._owner, is_file, folder_id))
+            self._db.executemany("REPLACE INTO items VALUES (?, ?, ?, ?)",
+                                 [(self._owner, is_file, item_id, folder_id) for item_id in item_ids])
+
+    def invalidate_folder(self, folder_id, kind=None):
+        """清除文件夹 folder_id 的缓存，kind 为 None 时同时清除文件与子文件夹列表"""
+        if not self._owner:
+            return None
+        kinds = (kind, ) if kind else ('file', 'dir')
+        with self._lock, self._db:
+            self._db.executemany("DELETE FROM lists WHERE owner=? AND kind=? AND folder_id=?",
+                                 [(self._owner, k, folder_id) for k in kinds])
+
+    def invalidate_item(self, item_id, is_file=True):
+        """文件(夹)发生变化，清除其所在文件夹的缓存
+        文件夹的名称与描述出现在所有子孙文件夹的路径中，这些子孙文件夹的缓存同样清除
+        """
+        if not self._owner:
+            return None
+        with self._lock, self._db:
+            row = self._db.execute("SELECT folder_id FROM items WHERE owner=? AND is_file=? AND item_id=?",
+                                   (self._owner, int(is_file), item_id)).fetchone()
+            folder_ids = [row[0]] if row else []
+            kind = 'file' if is_file else 'dir'
+            if not is_file:  # 查找所有已缓存的子孙文件夹
+                todo = [item_id]
+                while todo:
+                    fid = todo.pop()
+                    if fid in folder_ids:
+                        continue
+                    folder_ids.append(fid)
+                    todo.extend(r[0] for r in self._db.execute(
+                        "SELECT item_id FROM items WHERE owner=? AND is_file=0 AND folder_id=?", (self._owner, fid)))
+            self._db.executemany("DELETE FROM lists WHERE owner=? AND kind=? AND folder_id=?",
+                                 [(self._owner, kind, fid) for fid in folder_ids])
+
+    def clear(self):
+        """清除当前用户的全部缓存"""
+        if not self._owner:
+            return None
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM lists WHERE owner=?", (self._owner, ))
+            self._db.execute("DELETE FROM items WHERE owner=?", (self._owner, ))
+
+
+class DurlCache:
+    """下载直链缓存，按 (分享链接, 提取码) 保存解析得到的文件信息，多个下载线程共用"""
+
+    def __init__(self, ttl=600):
+        self._ttl = ttl  # 缓存有效期(秒)，直链带有签名，过期后可能失效
+        self._lock = Lock()
+        self._items = {}  # {(share_url, pwd): (FileDetail, 过期时间)}
+
+    def set_ttl(self, ttl):
+        self._ttl = ttl
+
+    def get(self, share_url, pwd=''):
+        """读取缓存，不存在或者已过期返回 None"""
+        with self._lock:
+            item = self._items.get((share_url, pwd))
+            if item and item[1] < time():
+                del self._items[(share_url, pwd)]
+                item = None
+        return item[0] if item else None
+
+    def put(self, share_url, pwd, info):
+        with self._lock:
+            self._items[(share_url, pwd)] = (info, time() + self._ttl)
+
+    def invalidate(self, share_url, pwd=''):
+        with self._lock:
+            self._items.pop((share_url, pwd), None)
+
+    def invalidate_durl(self, durl):
+        """直链请求返回 403/410 时，清除所有指向该直链的缓存"""
+        with self._lock:
+            for key in [k for k, v in self._items.items() if v[0].durl == durl]:
+                del self._items[key]
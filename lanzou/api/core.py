@@ -6,17 +6,24 @@ import os
 import pickle
 import re
 import shutil
-from threading import Thread
-from time import sleep
+from io import BytesIO
+from threading import Thread, Lock
+from time import sleep, time
 from datetime import datetime
+from queue import Queue
 from urllib3 import disable_warnings
 from random import shuffle, uniform
 from typing import List, Tuple
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
 
 import requests
+from requests.adapters import HTTPAdapter
 from requests_toolbelt import MultipartEncoder, MultipartEncoderMonitor
 from urllib3.exceptions import InsecureRequestWarning
+from lanzou.api.cache import ListCache, DurlCache
+from lanzou.api.limiter import TokenBucket
+from lanzou.api.mirrors import MirrorTracker
+from lanzou.api import parser
 from lanzou.api.models import FileList, FolderList
 from lanzou.api.types import *
 from lanzou.api.utils import *
@@ -41,12 +48,41 @@ class LanZouCloud(object):
     CAPTCHA_ERROR = 10
     OFFICIAL_LIMITED = 11
 
+    _IDEMPOTENT_TASKS = {5, 12, 18, 19, 22, 47}  # 只查询不修改的 doupload 任务，失败后可以安全重试
+
+    _MIRROR_DOMAINS = [
+        'lanzouw.com',  # 鲁ICP备15001327号-7, 2021-09-02
+        'lanzoui.com',  # 鲁ICP备15001327号-6, 2020-06-09
+        'lanzoux.com'  # 鲁ICP备15001327号-5, 2020-06-09
+    ]
+
     def __init__(self):
         self._session = requests.Session()
+        self._conn_stats = {}  # 已关闭连接池的请求数与新建连接数 {host: [requests, connections]}
+        self.set_pool_size(10)
         self._timeout = 15  # 每个请求的超时(不包含下载响应体的用时)
         self._max_size = 100  # 单个文件大小上限 MB
         self._upload_delay = (0, 0)  # 文件上传延时
+        self._dl_segments = 4  # 单文件分段下载的并发连接数
+        self._segment_min = 4 * 1048576  # 每个分段的最小字节数
+        self._up_threads = 3  # 批量上传文件夹时同时上传的文件数
+        self._page_window = 4  # 分页获取列表时同时请求的页数
+        self._retry_policy = {  # 各类请求的 (最多尝试次数, 退避基数秒)
+            'read': (3, 0.5),  # 幂等请求: 页面、列表、查询等
+            'write': (1, 0),  # 非幂等请求: 创建、删除、上传等，重复提交可能产生副作用，不自动重试
+            'stream': (5, 1),  # 下载数据流，中断后从已下载的位置续传
+        }
+        self._crawl_threads = 4  # 解析分享文件夹时同时请求的子文件夹数
+        self._info_threads = 8  # 批量获取分享信息时的并发请求数
+        self._size_lock = Lock()  # 多线程更新任务进度用
+        self._cache = None  # 文件(夹)列表的本地缓存
+        self._durl_cache = DurlCache()  # 下载直链缓存
         self._host_url = 'https://pan.lanzouo.com'
+        self._mirrors = MirrorTracker(LanZouCloud._MIRROR_DOMAINS)  # 镜像域名健康状况
+        self._limiters = {  # 请求速率限制，控制请求(页面、接口)与数据传输(下载、上传)分开计算
+            'control': TokenBucket(5, 10),
+            'transfer': TokenBucket(10, 20),
+        }
         self._doupload_url = 'https://pc.woozooo.com/doupload.php'
         self._account_url = 'https://pc.woozooo.com/account.php'
         self._mydisk_url = 'https://pc.woozooo.com/mydisk.php'
@@ -58,33 +94,80 @@ class LanZouCloud(object):
         }
         disable_warnings(InsecureRequestWarning)  # 全局禁用 SSL 警告
 
-    def _get(self, url, **kwargs):
+    def _request(self, method, url, **kwargs):
+        """依次尝试各个镜像域名发送一次请求，全部失败返回 None，超时抛出 TimeoutError"""
+        kind = 'transfer' if kwargs.get('stream') or 'fileup.php' in url else 'control'
+        self._limiters[kind].acquire()
         for possible_url in self._all_possible_urls(url):
+            start = time()
             try:
                 kwargs.setdefault('timeout', self._timeout)
                 kwargs.setdefault('headers', self._headers)
-                return self._session.get(possible_url, verify=False, **kwargs)
+                resp = self._session.request(method, possible_url, verify=False, **kwargs)
+                self._mirror_report(possible_url, time() - start)
+                if resp.status_code in (429, 503):  # 请求过快
+                    self._throttled(kind)
+                elif not kwargs.get('stream') and self._solve_challenge(resp):  # 带上 cookie 重新请求
+                    resp = self._session.request(method, possible_url, verify=False, **kwargs)
+                else:
+                    self._limiters[kind].on_success()
+                return resp
             except requests.Timeout:
+                self._mirror_report(possible_url, None)
                 logger.warning("Encountered timeout error while requesting network!")
                 raise TimeoutError
             except (ConnectionError, requests.RequestException):
-                logger.debug(f"Get {possible_url} failed, try another domain")
+                self._mirror_report(possible_url, None)
+                logger.debug(f"{method} {possible_url} failed, try another domain")
 
         return None
 
-    def _post(self, url, data, **kwargs):
-        for possible_url in self._all_possible_urls(url):
+    def _solve_challenge(self, resp) -> bool:
+        """响应为 acw_sc__v2 验证页面时计算 cookie 并保存到会话，有效期内的请求都会带上该 cookie"""
+        # 在页面被过多访问或其他情况下，有时候会先返回一个加密的页面，其执行计算出一个acw_sc__v2后放入页面后再重新访问页面才能获得正常页面
+        if 'text/html' not in resp.headers.get('Content-Type', 'text/html') or not is_acw_challenge(resp.text):
+            return False
+        acw_sc__v2 = calc_acw_sc__v2(resp.text)
+        max_age = re.search(r"max-age=(\d+)", resp.text)
+        max_age = int(max_age.group(1)) if max_age else 3600  # 页面脚本设置的 cookie 有效期，默认 1 小时
+        self._session.cookies.set("acw_sc__v2", acw_sc__v2, expires=int(time()) + max_age)
+        logger.debug(f"Set Cookie: acw_sc__v2={acw_sc__v2}, max-age={max_age}")
+        self._throttled()
+        return True
+
+    def _throttled(self, kind='control'):
+        """遇到限流(acw_sc__v2 验证页面、验证码、请求过快等)，降低请求速率"""
+        self._limiters[kind].on_throttled()
+        logger.debug(f"Throttled, {kind} rate limit: {self._limiters[kind].rate:.2f}/s")
+
+    def _backoff(self, retry, attempt):
+        """第 attempt 次失败后的等待，指数退避并加入随机抖动，避免多个线程同时重试"""
+        base = self._retry_policy[retry][1]
+        sleep(base * 2 ** attempt * uniform(0.5, 1.5))
+
+    def _with_retry(self, retry, func, *args, **kwargs):
+        """按 retry 类别的重试次数调用 func，返回 None 或超时视为失败，retry 为 None 时只调用一次"""
+        attempts = self._retry_policy[retry][0] if retry else 1
+        for attempt in range(attempts):
             try:
-                kwargs.setdefault('timeout', self._timeout)
-                kwargs.setdefault('headers', self._headers)
-                return self._session.post(possible_url, data, verify=False, **kwargs)
-            except requests.Timeout:
-                logger.warning("Encountered timeout error while requesting network!")
-                raise TimeoutError
-            except (ConnectionError, requests.RequestException):
-                logger.debug(f"Post to {possible_url} ({data}) failed, try another domain")
-
-        return None
+                result = func(*args, **kwargs)
+            except TimeoutError:
+                if attempt + 1 >= attempts:
+                    raise
+                result = None
+            if result is not None or attempt + 1 >= attempts:
+                return result
+            logger.debug(f"Retry {retry} request: attempt={attempt + 1}/{attempts}")
+            self._backoff(retry, attempt)
+
+    def _get(self, url, retry='read', **kwargs):
+        return self._with_retry(retry, self._request, 'GET', url, **kwargs)
+
+    def _post(self, url, data, retry='auto', **kwargs):
+        if retry == 'auto':  # 根据任务类型判断请求是否幂等
+            task = data.get('task') if isinstance(data, dict) else None
+            retry = 'read' if task in LanZouCloud._IDEMPOTENT_TASKS else 'write'
+        return self._with_retry(retry, self._request, 'POST', url, data=data, **kwargs)
 
     def _get_response_host(self, info):
         """获取蓝奏响应的下载 host 域名"""
@@ -92,16 +175,34 @@ class LanZouCloud(object):
         if new_host and new_host != self._host_url:
             self._host_url = new_host
 
-    @staticmethod
-    def _all_possible_urls(url: str) -> List[str]:
-        """蓝奏云的主域名有时会挂掉, 此时尝试切换到备用域名"""
-        available_domains = [
-            'lanzouw.com',  # 鲁ICP备15001327号-7, 2021-09-02
-            'lanzoui.com',  # 鲁ICP备15001327号-6, 2020-06-09
-            'lanzoux.com'  # 鲁ICP备15001327号-5, 2020-06-09
-        ]
-        return [url.replace('lanzouo.com', d) for d in available_domains]
+    def _all_possible_urls(self, url: str) -> List[str]:
+        """蓝奏云的主域名有时会挂掉, 此时尝试切换到备用域名，备用域名按健康状况排序"""
+        if 'lanzouo.com' not in url:
+            return [url]
+        return [url.replace('lanzouo.com', d) for d in self._mirrors.ordered()]
+
+    def _mirror_report(self, url, latency):
+        """记录镜像域名的请求结果，latency 为 None 表示请求失败，同时在后台探测冷却结束的失败域名"""
+        domain = self._mirrors.domain_of(url)
+        if domain is None:
+            return None
+        if latency is None:
+            self._mirrors.report_fail(domain)
+        else:
+            self._mirrors.report_ok(domain, latency)
+        for domain in self._mirrors.take_probes():
+            Thread(target=self._probe_mirror, args=(domain, ), daemon=True).start()
 
+    def _probe_mirror(self, domain):
+        """探测镜像域名是否恢复，有任何响应即视为可用"""
+        start = time()
+        try:
+            self._session.head(f'https://pan.{domain}', timeout=self._timeout, verify=False, allow_redirects=False)
+        except requests.RequestException:
+            logger.debug(f"Probe mirror {domain} failed")
+            self._mirrors.probe_done(domain, False)
+        else:
+            self._mirrors.probe_done(domain, True, time() - start)
 
     def set_max_size(self, max_size=100) -> int:
         """设置单文件大小限制(会员用户可超过 100M)"""
@@ -110,6 +211,111 @@ class LanZouCloud(object):
         self._max_size = max_size
         return LanZouCloud.SUCCESS
 
+    def set_pool_size(self, size=10) -> int:
+        """设置每个域名的连接池大小(保持长连接的数量)，应不小于同时进行的请求数
+        并发请求超过连接池大小时，多出的连接用完即关闭，下次请求需要重新握手
+        """
+        if size < 1:
+            return LanZouCloud.FAILED
+        for prefix in ('https://', 'http://'):
+            old_adapter = self._session.adapters.get(prefix)
+            # pool_connections 为保留连接池的域名数，镜像域名与下载服务器都需要保持长连接
+            self._session.mount(prefix, HTTPAdapter(pool_connections=32, pool_maxsize=size))
+            if old_adapter is not None:
+                self._collect_conn_stats(old_adapter)
+                old_adapter.close()  # 正在使用的连接归还时自动关闭
+        return LanZouCloud.SUCCESS
+
+    def set_http2(self, enable=True) -> int:
+        """启用 HTTP/2 (需要 urllib3>=2.3 与 h2，对整个进程生效)，不支持时返回 FAILED"""
+        try:
+            import h2  # noqa: F401
+            from urllib3.http2 import inject_into_urllib3, extract_from_urllib3
+        except ImportError:
+            return LanZouCloud.FAILED
+        inject_into_urllib3() if enable else extract_from_urllib3()
+        return LanZouCloud.SUCCESS
+
+    def _collect_conn_stats(self, adapter, stats=None) -> dict:
+        """累加 adapter 中各连接池的请求数与新建连接数"""
+        stats = self._conn_stats if stats is None else stats
+        pools = adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            count = stats.setdefault(pool.host, [0, 0])
+            count[0] += pool.num_requests
+            count[1] += pool.num_connections
+        return stats
+
+    def get_connection_stats(self) -> dict:
+        """连接复用情况 {host: {'requests': 请求数, 'connections': 新建连接数, 'reused': 复用连接的请求数}}"""
+        stats = {host: list(count) for host, count in self._conn_stats.items()}
+        for adapter in set(self._session.adapters.values()):
+            self._collect_conn_stats(adapter, stats)
+        return {host: {'requests': r, 'connections': c, 'reused': max(r - c, 0)} for host, (r, c) in stats.items()}
+
+    def set_rate_limit(self, kind, rate, burst=None) -> int:
+        """设置请求速率上限(个/秒)，kind 为 'control'(页面、接口) 或 'transfer'(下载、上传)，rate 为 0 时不限速"""
+        if kind not in self._limiters or rate < 0:
+            return LanZouCloud.FAILED
+        self._limiters[kind].set_rate(rate, burst or max(1, int(rate * 2)))
+        return LanZouCloud.SUCCESS
+
+    def set_retry_policy(self, retry, attempts, backoff) -> int:
+        """设置某类请求('read', 'write', 'stream')的最多尝试次数与退避基数(秒)"""
+        if retry not in self._retry_policy or attempts < 1 or backoff < 0:
+            return LanZouCloud.FAILED
+        self._retry_policy[retry] = (attempts, backoff)
+        return LanZouCloud.SUCCESS
+
+    def set_download_segments(self, segments=4) -> int:
+        """设置单文件分段下载的并发连接数，1 表示单连接下载"""
+        if segments < 1:
+            return LanZouCloud.FAILED
+        self._dl_segments = segments
+        return LanZouCloud.SUCCESS
+
+    def set_upload_threads(self, threads=3) -> int:
+        """设置批量上传文件夹时同时上传的文件数"""
+        if threads < 1:
+            return LanZouCloud.FAILED
+        self._up_threads = threads
+        return LanZouCloud.SUCCESS
+
+    def set_list_cache(self, db_file, ttl=86400) -> int:
+        """启用文件(夹)列表的本地缓存，db_file 为 sqlite 数据库路径，ttl 为缓存有效期(秒)"""
+        if ttl <= 0:
+            return LanZouCloud.FAILED
+        if self._cache is None:
+            self._cache = ListCache(db_file, ttl)
+            self._cache.set_owner(self._session.cookies.get('ylogin'))
+        else:
+            self._cache.set_ttl(ttl)
+        return LanZouCloud.SUCCESS
+
+    def _cache_call(self, method, *args, **kwargs):
+        """调用缓存的方法，未启用缓存时什么也不做"""
+        if self._cache is not None:
+            return getattr(self._cache, method)(*args, **kwargs)
+        return None
+
+    def set_durl_ttl(self, ttl=600) -> int:
+        """设置下载直链缓存的有效期(秒)，0 表示不缓存"""
+        if ttl < 0:
+            return LanZouCloud.FAILED
+        self._durl_cache.set_ttl(ttl)
+        return LanZouCloud.SUCCESS
+
+    def get_cached_file_list(self, folder_id=-1):
+        """从本地缓存读取文件列表，没有缓存时返回 None"""
+        return self._cache_call('get', 'file', folder_id)
+
+    def get_cached_dir_list(self, folder_id=-1):
+        """从本地缓存读取子文件夹列表与全路径，没有缓存时返回 None"""
+        return self._cache_call('get', 'dir', folder_id)
+
     def set_upload_delay(self, t_range: tuple) -> int:
         """设置上传大文件数据块时，相邻两次上传之间的延时，减小被封号的可能"""
         if 0 <= t_range[0] <= t_range[1]:
@@ -142,6 +348,7 @@ class LanZouCloud(object):
             if '成功' in html.json()['info']:
                 self._cookies = html.cookies.get_dict()
                 self._session.cookies.update(self._cookies)
+                self._cache_call('set_owner', self._cookies.get('ylogin'))
                 return LanZouCloud.SUCCESS
         except ValueError:
             pass
@@ -157,14 +364,20 @@ class LanZouCloud(object):
         html = self._get(self._account_url)
         if not html:
             return LanZouCloud.NETWORK_ERROR
-        return LanZouCloud.FAILED if '网盘用户登录' in html.text else LanZouCloud.SUCCESS
+        if '网盘用户登录' in html.text:
+            return LanZouCloud.FAILED
+        self._cache_call('set_owner', cookie.get('ylogin'))
+        return LanZouCloud.SUCCESS
 
     def logout(self) -> int:
         """注销"""
         html = self._get(self._account_url, params={'action': 'logout'})
         if not html:
             return LanZouCloud.NETWORK_ERROR
-        return LanZouCloud.SUCCESS if '退出系统成功' in html.text else LanZouCloud.FAILED
+        if '退出系统成功' not in html.text:
+            return LanZouCloud.FAILED
+        self._cache_call('set_owner', None)
+        return LanZouCloud.SUCCESS
 
     def delete(self, fid, is_file=True) -> int:
         """把网盘的文件、无子文件夹的文件夹放到回收站"""
@@ -172,7 +385,10 @@ class LanZouCloud(object):
         result = self._post(self._doupload_url, post_data)
         if not result:
             return LanZouCloud.NETWORK_ERROR
-        return LanZouCloud.SUCCESS if result.json()['zt'] == 1 else LanZouCloud.FAILED
+        if result.json()['zt'] != 1:
+            return LanZouCloud.FAILED
+        self._cache_call('invalidate_item', fid, is_file)
+        return LanZouCloud.SUCCESS
 
     def clean_rec(self) -> int:
         """清空回收站"""
@@ -329,7 +545,10 @@ class LanZouCloud(object):
         html = self._post(self._mydisk_url + '?item=recycle', post_data)
         if not html:
             return LanZouCloud.NETWORK_ERROR
-        return LanZouCloud.SUCCESS if '恢复成功' in html.text else LanZouCloud.FAILED
+        if '恢复成功' not in html.text:
+            return LanZouCloud.FAILED
+        self._cache_call('invalidate_item', fid, is_file)  # 恢复到原来的文件夹
+        return LanZouCloud.SUCCESS
 
     def recovery_multi(self, files, folders) -> int:
         """从回收站恢复多个文件(夹)"""
@@ -348,7 +567,13 @@ class LanZouCloud(object):
         html = self._post(self._mydisk_url + '?item=recycle', post_data)
         if not html:
             return LanZouCloud.NETWORK_ERROR
-        return LanZouCloud.SUCCESS if '恢复成功' in html.text else LanZouCloud.FAILED
+        if '恢复成功' not in html.text:
+            return LanZouCloud.FAILED
+        for fid in files or []:
+            self._cache_call('invalidate_item', fid, True)
+        for fid in folders or []:
+            self._cache_call('invalidate_item', fid, False)
+        return LanZouCloud.SUCCESS
 
     def recovery_all(self) -> int:
         """从回收站恢复所有文件(夹)"""
@@ -361,38 +586,75 @@ class LanZouCloud(object):
         second_page = self._post(self._mydisk_url + '?item=recycle', post_data)
         if not second_page:
             return LanZouCloud.NETWORK_ERROR
-        return LanZouCloud.SUCCESS if '还原成功' in second_page.text else LanZouCloud.FAILED
+        if '还原成功' not in second_page.text:
+            return LanZouCloud.FAILED
+        self._cache_call('clear')  # 无法得知恢复到了哪些文件夹
+        return LanZouCloud.SUCCESS
+
+    def _get_pages(self, fetch_page, first_page=1) -> list:
+        """分页获取数据，第一页之后每次并发请求 _page_window 页，遇到空页停止
+        :param fetch_page: fetch_page(page) 返回该页的数据列表，空列表表示没有更多数据，None 表示请求失败
+        :return 按页码顺序拼接的全部数据
+        """
+        def _fetch(page):
+            items = self._with_retry('read', fetch_page, page)
+            if items is None:
+                logger.debug(f"Get page {page} failed")
+                raise TimeoutError
+            return items
+
+        result = list(_fetch(first_page))
+        if not result:
+            return result
+        page = first_page + 1
+        with ThreadPoolExecutor(max_workers=self._page_window) as ex:
+            while True:
+                tasks = [ex.submit(_fetch, p) for p in range(page, page + self._page_window)]
+                for task in tasks:
+                    items = task.result()
+                    if not items:  # 之后的页都是多请求的，直接丢弃
+                        for t in tasks:
+                            t.cancel()
+                        return result
+                    result.extend(items)
+                page += self._page_window
 
     def get_file_list(self, folder_id=-1) -> FileList:
         """获取文件列表"""
-        page = 1
-        file_list = FileList()
-        while True:
-            post_data = {'task': 5, 'folder_id': folder_id, 'pg': page}
-            resp = self._post(self._doupload_url, post_data)
+        not_login = False
+
+        def _fetch_page(page):
+            nonlocal not_login
+            # 整页请求由 _get_pages 统一重试
+            resp = self._post(self._doupload_url, {'task': 5, 'folder_id': folder_id, 'pg': page}, retry=None)
             if not resp:  # 网络异常，重试
-                continue
-            else:
+                return None
+            try:
                 resp = resp.json()
-            if resp["info"] == 0:
-                break  # 已经拿到了全部的文件信息
-            else:
-                page += 1  # 下一页
-            # 文件信息处理
+            except ValueError:
+                return None
             if resp["zt"] == 9:  # login not
                 logger.debug(f"Not login resp={resp}")
-                break
-            for file in resp["text"]:
-                file_list.append(File(
-                    id=int(file['id']),
-                    name=file['name_all'].replace("&amp;", "&"),
-                    time=file['time'],  # 上传时间
-                    size=file['size'].replace(",", ""),  # 文件大小
-                    type=file['name_all'].split('.')[-1],  # 文件类型
-                    downs=int(file['downs']),  # 下载次数
-                    has_pwd=True if int(file['onof']) == 1 else False,  # 是否存在提取码
-                    has_des=True if int(file['is_des']) == 1 else False  # 是否存在描述
-                ))
+                not_login = True
+                return []
+            if resp["info"] == 0:
+                return []  # 已经拿到了全部的文件信息
+            return resp["text"]
+
+        file_list = FileList()
+        for file in self._get_pages(_fetch_page):
+            file_list.append(File(
+                id=int(file['id']),
+                name=file['name_all'].replace("&amp;", "&"),
+                time=file['time'],  # 上传时间
+                size=file['size'].replace(",", ""),  # 文件大小
+                type=file['name_all'].split('.')[-1],  # 文件类型
+                downs=int(file['downs']),  # 下载次数
+                has_pwd=True if int(file['onof']) == 1 else False,  # 是否存在提取码
+                has_des=True if int(file['is_des']) == 1 else False  # 是否存在描述
+            ))
+        if not not_login:
+            self._cache_call('put', 'file', folder_id, file_list, [f.id for f in file_list])
         return file_list
 
     def get_dir_list(self, folder_id=-1) -> Tuple[FolderList, FolderList]:
@@ -423,6 +685,8 @@ class LanZouCloud(object):
                     desc=folder['folder_des'][1:-1],
                     now=int(folder['now'])
                 ))
+            if path_list:  # folder_id 有误时不缓存
+                self._cache_call('put', 'dir', folder_id, (folder_list, path_list), [f.id for f in folder_list])
         return folder_list, path_list
 
     def clean_ghost_folders(self):
@@ -449,10 +713,19 @@ class LanZouCloud(object):
         return LanZouCloud.SUCCESS
 
     def get_file_info_by_url(self, share_url, pwd='') -> FileDetail:
-        """获取文件各种信息(包括下载直链)
+        """获取文件各种信息(包括下载直链)，成功的结果会缓存一段时间
         :param share_url: 文件分享链接
         :param pwd: 文件提取码(如果有的话)
         """
+        info = self._durl_cache.get(share_url, pwd)
+        if info is None:
+            info = self._parse_file_info(share_url, pwd)
+            if info.code == LanZouCloud.SUCCESS:
+                self._durl_cache.put(share_url, pwd, info)
+        return info
+
+    def _parse_file_info(self, share_url, pwd='') -> FileDetail:
+        """解析文件分享页面，获取文件信息与下载直链"""
         if not is_file_url(share_url):  # 非文件链接返回错误
             return FileDetail(LanZouCloud.URL_INVALID, pwd=pwd, url=share_url)
 
@@ -460,17 +733,7 @@ class LanZouCloud(object):
         if not first_page:
             return FileDetail(LanZouCloud.NETWORK_ERROR, pwd=pwd, url=share_url)
 
-        if "acw_sc__v2" in first_page.text:
-            # 在页面被过多访问或其他情况下，有时候会先返回一个加密的页面，其执行计算出一个acw_sc__v2后放入页面后再重新访问页面才能获得正常页面
-            # 若该页面进行了js加密，则进行解密，计算acw_sc__v2，并加入cookie
-            acw_sc__v2 = calc_acw_sc__v2(first_page.text)
-            self._session.cookies.set("acw_sc__v2", acw_sc__v2)
-            logger.debug(f"Set Cookie: acw_sc__v2={acw_sc__v2}")
-            first_page = self._get(share_url)  # 文件分享页面(第一页)
-            if not first_page:
-                return FileDetail(LanZouCloud.NETWORK_ERROR, pwd=pwd, url=share_url)
-
-        first_page = remove_notes(first_page.text)  # 去除网页里的注释
+        first_page = parser.strip_notes(first_page.text)  # 去除网页里的注释
         if '文件取消' in first_page or '文件不存在' in first_page:
             return FileDetail(LanZouCloud.FILE_CANCELLED, pwd=pwd, url=share_url)
 
@@ -479,59 +742,40 @@ class LanZouCloud(object):
             if len(pwd) == 0:
                 return FileDetail(LanZouCloud.LACK_PASSWORD, pwd=pwd, url=share_url)  # 没给提取码直接退出
             # data : 'action=downprocess&sign=AGZRbwEwU2IEDQU6BDRUaFc8DzxfMlRjCjTPlVkWzFSYFY7ATpWYw_c_c&p='+pwd,
-            sign = re.search(r"sign=(\w+?)&", first_page)
-            sign = sign.group(1) if sign else ""
+            sign = parser.FILE_PWD_PAGE.scan(first_page)['sign']
             post_data = {'action': 'downprocess', 'sign': sign, 'p': pwd}
-            link_info = self._post(self._host_url + '/ajaxm.php', post_data)  # 保存了重定向前的链接信息和文件名
+            link_info = self._post(self._host_url + '/ajaxm.php', post_data, retry='read')  # 保存了重定向前的链接信息和文件名
             second_page = self._get(share_url)  # 再次请求文件分享页面，可以看见文件名，时间，大小等信息(第二页)
             if not link_info or not second_page.text:
                 return FileDetail(LanZouCloud.NETWORK_ERROR, pwd=pwd, url=share_url)
             link_info = link_info.json()
-            second_page = remove_notes(second_page.text)
             # 提取文件信息
             f_name = link_info['inf'].replace("*", "_")
-            f_size = re.search(r'大小.+?(\d[\d\.,]+\s?[BKM]?)<', second_page)
-            f_size = f_size.group(1) if f_size else ''
-            f_time = re.search(r'class="n_file_infos">(.+?)</span>', second_page)
-            f_time = f_time.group(1) if f_time else ''
-            f_desc = re.search(r'class="n_box_des">(.*?)</div>', second_page)
-            f_desc = f_desc.group(1) if f_desc else ''
+            page = parser.FILE_PWD_SECOND_PAGE.scan(parser.strip_notes(second_page.text))
+            f_size, f_time, f_desc = page['size'], page['time'], page['desc']
         else:  # 文件没有设置提取码时,文件信息都暴露在分享页面上
-            para = re.search(r'<iframe.*?src="(.+?)"', first_page).group(1)  # 提取下载页面 URL 的参数
-            # 文件名位置变化很多
-            f_name = re.search(r"<title>(.+?) - 蓝奏云</title>", first_page) or \
-                     re.search(r'<div class="filethetext".+?>([^<>]+?)</div>', first_page) or \
-                     re.search(r'<div style="font-size.+?>([^<>].+?)</div>', first_page) or \
-                     re.search(r"var filename = '(.+?)';", first_page) or \
-                     re.search(r'id="filenajax">(.+?)</div>', first_page) or \
-                     re.search(r'<div class="b"><span>([^<>]+?)</span></div>', first_page)
-            f_name = f_name.group(1).replace("*", "_") if f_name else "未匹配到文件名"
-
-            f_time = re.search(r'>(\d+\s?[秒天分小][钟时]?前|[昨前]天\s?[\d:]+?|\d+\s?天前|\d{4}-\d\d-\d\d)<', first_page)
-            f_time = f_time.group(1) if f_time else ''
-            f_size = re.search(r'大小.+?(\d[\d\.,]+\s?[BKM]?)<', first_page) or \
-                     re.search(r'大小：(.+?)</div>', first_page)  # VIP 分享页面
-            f_size = f_size.group(1) if f_size else ''
-            f_desc = re.search(r'文件描述.+?</span><br>\n?\s*(.*?)\s*</td>', first_page)
-            f_desc = f_desc.group(1) if f_desc else ''
+            page = parser.FILE_PAGE.scan(first_page)
+            para = page['para']  # 下载页面 URL 的参数
+            f_name = page['name'].replace("*", "_") or "未匹配到文件名"
+            f_time, f_size, f_desc = page['time'], page['size'], page['desc']
+            if not para:
+                return FileDetail(LanZouCloud.FAILED, name=f_name, time=f_time, size=f_size, desc=f_desc, pwd=pwd, url=share_url)
             first_page = self._get(self._host_url + para)
             if not first_page:
                 return FileDetail(LanZouCloud.NETWORK_ERROR, name=f_name, time=f_time, size=f_size, desc=f_desc, pwd=pwd, url=share_url)
-            first_page = remove_notes(first_page.text)
+            first_page = parser.strip_notes(first_page.text)
+            page = parser.DOWN_PAGE.scan(first_page)
             # 一般情况 sign 的值就在 data 里，有时放在变量后面
-            sign = re.search(r"'sign':(.+?),", first_page).group(1)
+            sign = page['sign']
             if len(sign) < 20:  # 此时 sign 保存在变量里面, 变量名是 sign 匹配的字符
-                sign = re.search(rf"var {sign}\s*=\s*'(.+?)';", first_page).group(1)
+                sign = parser.find_var(first_page, sign)
             post_data = {'action': 'downprocess', 'sign': sign, 'ves': 1}
             # 某些特殊情况 share_url 会出现 webpage 参数, post_data 需要更多参数
             # https://github.com/zaxtyson/LanZouCloud-API/issues/74
             if "?webpage=" in share_url:
-                ajax_data = re.search(r"var ajaxdata\s*=\s*'(.+?)';", first_page).group(1)
-                web_sign = re.search(r"var websign\s*=\s*'(.+?)';", first_page).group(1)
-                web_sign_key = re.search(r"var websignkey\s*=\s*'(.+?)';", first_page).group(1)
-                post_data = {'action': 'downprocess', 'signs': ajax_data, 'sign': sign, 'ves': 1,
-                             'websign': web_sign, 'websignkey': web_sign_key}
-            link_info = self._post(self._host_url + '/ajaxm.php', post_data)
+                post_data = {'action': 'downprocess', 'signs': page['ajaxdata'], 'sign': sign, 'ves': 1,
+                             'websign': page['websign'], 'websignkey': page['websignkey']}
+            link_info = self._post(self._host_url + '/ajaxm.php', post_data, retry='read')
             if not link_info:
                 return FileDetail(LanZouCloud.NETWORK_ERROR, name=f_name, time=f_time, size=f_size, desc=f_desc, pwd=pwd, url=share_url)
             link_info = link_info.json()
@@ -549,16 +793,17 @@ class LanZouCloud(object):
                               name=f_name, time=f_time, size=f_size,
                               desc=f_desc, pwd=pwd, url=share_url)
         download_page.encoding = 'utf-8'
-        download_page_html = remove_notes(download_page.text)
+        download_page_html = parser.strip_notes(download_page.text)
         if '网络异常' not in download_page_html:  # 没有遇到验证码
             direct_url = download_page.headers['Location']  # 重定向后的真直链
         else:  # 遇到验证码，验证后才能获取下载直链
-            file_token = re.findall("'file':'(.+?)'", download_page_html)[0]
-            file_sign = re.findall("'sign':'(.+?)'", download_page_html)[0]
+            self._throttled()
+            page = parser.CAPTCHA_PAGE.scan(download_page_html)
+            file_token, file_sign = page['file'], page['sign']
             check_api = 'https://vip.d0.baidupan.com/file/ajax.php'
             post_data = {'file': file_token, 'el': 2, 'sign': file_sign}
             sleep(2)  # 这里必需等待2s, 否则直链返回 ?SignError
-            resp = self._post(check_api, post_data)
+            resp = self._post(check_api, post_data, retry='read')
             direct_url = resp.json()['url']
             if not direct_url:
                 return FileDetail(LanZouCloud.CAPTCHA_ERROR,
@@ -572,7 +817,7 @@ class LanZouCloud(object):
 
     def get_file_info_by_id(self, file_id) -> FileDetail:
         """通过 id 获取文件信息"""
-        info = self.get_share_info(file_id)
+        info = self.get_share_info(file_id, fields=('url', 'pwd'))
         if info.code != LanZouCloud.SUCCESS:
             return FileDetail(info.code)
         return self.get_file_info_by_url(info.url, info.pwd)
@@ -586,11 +831,14 @@ class LanZouCloud(object):
 
     def get_durl_by_id(self, file_id) -> DirectUrlInfo:
         """登录用户通过id获取直链"""
-        info = self.get_share_info(file_id, is_file=True)  # 能获取直链，一定是文件
+        info = self.get_share_info(file_id, is_file=True, fields=('url', 'pwd'))  # 能获取直链，一定是文件
         return self.get_durl_by_url(info.url, info.pwd)
 
-    def get_share_info(self, fid, is_file=True) -> ShareInfo:
-        """获取文件(夹)提取码、分享链接"""
+    def get_share_info(self, fid, is_file=True, fields=None) -> ShareInfo:
+        """获取文件(夹)提取码、分享链接
+        :param fields: 需要的字段，如 ('url', 'pwd')，为 None 时获取全部
+                       文件的 name、desc 需要额外请求一次，不需要时可以省去这次请求
+        """
         post_data = {'task': 22, 'file_id': fid} if is_file else {'task': 18, 'folder_id': fid}  # 获取分享链接和密码用
         f_info = self._post(self._doupload_url, post_data)
         if not f_info:
@@ -607,17 +855,39 @@ class LanZouCloud(object):
         pwd = f_info['pwd'] if int(f_info['onof']) == 1 else ''
         if 'f_id' in f_info.keys():  # 说明返回的是文件的信息
             url = f_info['is_newd'] + '/' + f_info['f_id']  # 文件的分享链接需要拼凑
-            file_info = self._post(self._doupload_url, {'task': 12, 'file_id': fid})  # 文件信息
-            if not file_info:
-                return ShareInfo(LanZouCloud.NETWORK_ERROR)
-            name = file_info.json()['text']  # 无后缀的文件名(获得后缀又要发送请求,没有就没有吧,尽可能减少请求数量)
-            desc = file_info.json()['info']
+            name = desc = ''
+            if fields is None or {'name', 'desc'} & set(fields):
+                file_info = self._post(self._doupload_url, {'task': 12, 'file_id': fid})  # 文件信息
+                if not file_info:
+                    return ShareInfo(LanZouCloud.NETWORK_ERROR)
+                name = file_info.json()['text']  # 无后缀的文件名(获得后缀又要发送请求,没有就没有吧,尽可能减少请求数量)
+                desc = file_info.json()['info']
         else:
             url = f_info['new_url']  # 文件夹的分享链接可以直接拿到
             name = f_info['name']  # 文件夹名
             desc = f_info['des']  # 文件夹描述
         return ShareInfo(LanZouCloud.SUCCESS, name=name, url=url, desc=desc, pwd=pwd)
 
+    def iter_share_info(self, items, fields=None):
+        """并发获取多个文件(夹)的提取码、分享链接，按完成顺序逐个返回
+        :param items: [(fid, is_file), ...]
+        :param fields: 同 get_share_info
+        :return 生成器，产生 ((fid, is_file), ShareInfo)
+        """
+        def _get_info(fid, is_file):
+            try:
+                return self.get_share_info(fid, is_file, fields)
+            except TimeoutError:
+                return ShareInfo(LanZouCloud.NETWORK_ERROR)
+
+        ex = ThreadPoolExecutor(max_workers=self._info_threads)
+        try:
+            tasks = {ex.submit(_get_info, *item): item for item in items}
+            for task in as_completed(tasks):
+                yield tasks[task], task.result()
+        finally:  # 调用方提前结束迭代时，取消尚未开始的请求
+            ex.shutdown(wait=False, cancel_futures=True)
+
     def set_passwd(self, fid, passwd='', is_file=True) -> int:
         """
         设置网盘文件(夹)的提取码, 现在非会员用户不允许关闭提取码
@@ -632,7 +902,10 @@ class LanZouCloud(object):
         result = self._post(self._doupload_url, post_data)
         if not result:
             return LanZouCloud.NETWORK_ERROR
-        return LanZouCloud.SUCCESS if result.json()['zt'] == 1 else LanZouCloud.FAILED
+        if result.json()['zt'] != 1:
+            return LanZouCloud.FAILED
+        self._cache_call('invalidate_item', fid, is_file)
+        return LanZouCloud.SUCCESS
 
     def mkdir(self, parent_id, folder_name, desc='') -> int:
         """创建文件夹(同时设置描述)"""
@@ -642,11 +915,7 @@ class LanZouCloud(object):
         if folder_list.find_by_name(folder_name):  # 如果文件夹已经存在，直接返回 id
             return folder_list.find_by_name(folder_name).id
         raw_folders = self.get_move_folders()
-        post_data = {"task": 2, "parent_id": parent_id or -1, "folder_name": folder_name,
-                     "folder_description": desc}
-        result = self._post(self._doupload_url, post_data)  # 创建文件夹
-        if not result or result.json()['zt'] != 1:
-            logger.debug(f"Mkdir {folder_name} error, parent_id={parent_id}")
+        if not self._mkdir_only(parent_id, folder_name, desc):
             return LanZouCloud.MKDIR_ERROR  # 正常时返回 id 也是 int，为了方便判断是否成功，网络异常或者创建失败都返回相同错误码
         # 允许再不同路径创建同名文件夹, 移动时可通过 get_move_paths() 区分
         for folder in self.get_move_folders():
@@ -656,6 +925,73 @@ class LanZouCloud(object):
         logger.debug(f"Mkdir {folder_name} error, parent_id={parent_id}")
         return LanZouCloud.MKDIR_ERROR
 
+    def _mkdir_only(self, parent_id, folder_name, desc='') -> bool:
+        """只发送创建文件夹的请求，不查询新文件夹的 id"""
+        post_data = {"task": 2, "parent_id": parent_id or -1, "folder_name": folder_name,
+                     "folder_description": desc}
+        result = self._post(self._doupload_url, post_data)  # 创建文件夹
+        if not result or result.json()['zt'] != 1:
+            logger.debug(f"Mkdir {folder_name} error, parent_id={parent_id}")
+            return False
+        self._cache_call('invalidate_folder', parent_id or -1, 'dir')
+        return True
+
+    def _mkdir_tree(self, parent_id, dir_paths, desc='') -> Tuple[dict, set]:
+        """在 parent_id 下按层级创建文件夹树，已存在的文件夹直接使用
+        全部文件夹列表只获取一次，每层创建完后再获取一次用于确定新文件夹的 id，
+        每个文件夹的子文件夹列表最多查询一次
+        :param dir_paths: 相对路径列表，如 ['a', 'a/b']，分隔符为 os.sep
+        :return ({相对路径: 文件夹 id}, 新建文件夹 id 集合)，创建失败的路径及其子路径不在结果中
+        """
+        known_ids = {f.id for f in self.get_move_folders()}
+        children = {}  # 子文件夹缓存 {parent_id: {name: id}}
+        created = set()
+        dir_ids = {'': parent_id}
+        levels = {}
+        for path in dir_paths:
+            levels.setdefault(path.count(os.sep), []).append(path)
+
+        for depth in sorted(levels):
+            to_create = []  # (相对路径, 父文件夹 id, 文件夹名)
+            for path in levels[depth]:
+                pid = dir_ids.get(os.path.dirname(path))
+                if pid is None:  # 父文件夹创建失败
+                    continue
+                name = name_format(os.path.basename(path).replace(' ', '_'))
+                if pid not in children:
+                    folders, _ = self.get_dir_list(pid)
+                    children[pid] = {f.name: f.id for f in folders}
+                if name in children[pid]:
+                    dir_ids[path] = children[pid][name]
+                else:
+                    to_create.append((path, pid, name))
+            to_create = [item for item in to_create if self._mkdir_only(item[1], item[2], desc)]
+            if not to_create:
+                continue
+
+            new_folders = {}  # 本层新出现的文件夹 {name: [id, ...]}
+            for folder in self.get_move_folders():
+                if folder.id not in known_ids:
+                    known_ids.add(folder.id)
+                    new_folders.setdefault(folder.name, []).append(folder.id)
+            names = [name for _, _, name in to_create]
+            for path, pid, name in to_create:
+                if names.count(name) == 1 and len(new_folders.get(name, [])) == 1:
+                    fid = new_folders[name][0]
+                else:  # 同一层有同名文件夹，只能查询父文件夹确定 id
+                    folders, _ = self.get_dir_list(pid)
+                    folder = folders.find_by_name(name)
+                    fid = folder.id if folder else None
+                if fid is None:
+                    logger.debug(f"Mkdir {name} error, parent_id={pid}")
+                    continue
+                logger.debug(f"Mkdir {name} #{fid} in parent_id={pid}")
+                dir_ids[path] = fid
+                children[pid][name] = fid
+                children[fid] = {}  # 新文件夹没有子文件夹，无需查询
+                created.add(fid)
+        return dir_ids, created
+
     def _set_dir_info(self, folder_id, folder_name, desc='') -> int:
         """重命名文件夹及其描述"""
         # 不能用于重命名文件，id 无效仍然返回成功
@@ -664,7 +1000,10 @@ class LanZouCloud(object):
         result = self._post(self._doupload_url, post_data)
         if not result:
             return LanZouCloud.NETWORK_ERROR
-        return LanZouCloud.SUCCESS if result.json()['zt'] == 1 else LanZouCloud.FAILED
+        if result.json()['zt'] != 1:
+            return LanZouCloud.FAILED
+        self._cache_call('invalidate_item', folder_id, False)
+        return LanZouCloud.SUCCESS
 
     def rename_dir(self, folder_id, folder_name) -> int:
         """重命名文件夹"""
@@ -684,6 +1023,7 @@ class LanZouCloud(object):
                 return LanZouCloud.NETWORK_ERROR
             elif result.json()['zt'] != 1:
                 return LanZouCloud.FAILED
+            self._cache_call('invalidate_item', fid, True)
             return LanZouCloud.SUCCESS
         else:
             # 文件夹描述可以置空
@@ -698,7 +1038,10 @@ class LanZouCloud(object):
         result = self._post(self._doupload_url, post_data)
         if not result:
             return LanZouCloud.NETWORK_ERROR
-        return LanZouCloud.SUCCESS if result.json()['zt'] == 1 else LanZouCloud.FAILED
+        if result.json()['zt'] != 1:
+            return LanZouCloud.FAILED
+        self._cache_call('invalidate_item', file_id, True)
+        return LanZouCloud.SUCCESS
 
     def get_move_folders(self) -> FolderList:
         """获取全部文件夹 id-name 列表，用于移动文件至新的文件夹"""
@@ -739,7 +1082,11 @@ class LanZouCloud(object):
         logger.debug(f"Move file file_id={file_id} to folder_id={folder_id}")
         if not result:
             return LanZouCloud.NETWORK_ERROR
-        return LanZouCloud.SUCCESS if result.json()['zt'] == 1 else LanZouCloud.FAILED
+        if result.json()['zt'] != 1:
+            return LanZouCloud.FAILED
+        self._cache_call('invalidate_item', file_id, True)
+        self._cache_call('invalidate_folder', folder_id, 'file')
+        return LanZouCloud.SUCCESS
 
     def move_folder(self, folder_id: int, parent_folder_id: int=-1) -> int:
         """移动文件夹(官方并没有直接支持此功能)"""
@@ -774,24 +1121,29 @@ class LanZouCloud(object):
         self.delete_rec(folder_id, False)
         return LanZouCloud.SUCCESS
 
-    def _upload_small_file(self, task, file_path, folder_id=-1, callback=None) -> Tuple[int, int, bool]:
-        """绕过格式限制上传不超过 max_size 的文件"""
+    def _upload_small_file(self, task, file_path, folder_id=-1, callback=None, exist_files=None) -> Tuple[int, int, bool]:
+        """绕过格式限制上传不超过 max_size 的文件
+        :param exist_files: 目标文件夹已有文件 {name: File}，为 None 时请求网盘获取
+        """
         if not os.path.isfile(file_path):
             return LanZouCloud.PATH_ERROR, 0, True
 
-        need_delete = False  # 上传完成是否删除
-        if not is_name_valid(os.path.basename(file_path)):  # 不允许上传的格式
-            file_path = let_me_upload(file_path)  # 添加了报尾的新文件
-            need_delete = True
+        filename = os.path.basename(file_path)
+        tail = b''
+        if not is_name_valid(filename):  # 不允许上传的格式，改名并在数据流末尾追加报尾
+            filename, tail = let_me_upload(file_path)
+        return self._upload_stream(task, filename, FileSlice(file_path, tail=tail), folder_id, callback, exist_files)
 
+    def _upload_stream(self, task, filename, file_, folder_id=-1, callback=None, exist_files=None) -> Tuple[int, int, bool]:
+        """以 filename 为文件名上传数据流 file_ (FileSlice 等带 read 的对象)，上传结束后关闭 file_"""
         # 文件已经存在同名文件就删除
-        filename = name_format(os.path.basename(file_path))
-        file_list = self.get_file_list(folder_id)
-        if file_list.find_by_name(filename):
-            self.delete(file_list.find_by_name(filename).id)
-        logger.debug(f'Upload file file_path={file_path} to folder_id={folder_id}')
+        filename = name_format(filename)
+        if exist_files is None:
+            exist_files = {f.name: f for f in self.get_file_list(folder_id)}
+        if filename in exist_files:
+            self.delete(exist_files[filename].id)
+        logger.debug(f'Upload file filename={filename} to folder_id={folder_id}')
 
-        file_ = open(file_path, 'rb')
         post_data = {
             "task": "1",
             "folder_id": str(folder_id),
@@ -807,20 +1159,27 @@ class LanZouCloud(object):
         # MultipartEncoderMonitor 每上传 8129 bytes数据调用一次回调函数，问题根源是 httplib 库
         # issue : https://github.com/requests/toolbelt/issues/75
         # 上传完成后，回调函数会被错误的多调用一次(强迫症受不了)。因此，下面重新封装了回调函数，修改了接受的参数，并阻断了多余的一次调用
-        self._upload_finished_flag = False  # 上传完成的标志
-        start_size = task.now_size
-        logger.debug(f"upload small file: start_size={start_size}")
+        # 进度按增量累加到 task 上，批量上传时多个文件可以同时更新同一个 task
+        finished = False  # 上传完成的标志
+        last_read = 0
+        logger.debug(f"upload small file: start_size={task.now_size}")
 
         def _call_back(read_monitor):
-            if callback is not None:
-                if not self._upload_finished_flag:
-                    task.now_size = start_size + read_monitor.bytes_read
+            nonlocal finished, last_read
+            if not finished:
+                with self._size_lock:
+                    task.now_size += read_monitor.bytes_read - last_read
+                last_read = read_monitor.bytes_read
+                if callback is not None:
                     callback()
-                if read_monitor.len == read_monitor.bytes_read:
-                    self._upload_finished_flag = True
+            if read_monitor.len == read_monitor.bytes_read:
+                finished = True
 
         monitor = MultipartEncoderMonitor(post_data, _call_back)
-        result = self._post('https://pc.woozooo.com/fileup.php', monitor, headers=tmp_header, timeout=None)
+        try:
+            result = self._post('https://pc.woozooo.com/fileup.php', monitor, headers=tmp_header, timeout=None)
+        finally:
+            file_.close()
         if not result:  # 网络异常
             logger.debug('Upload file no result')
             return LanZouCloud.NETWORK_ERROR, 0, True
@@ -834,75 +1193,66 @@ class LanZouCloud(object):
             return LanZouCloud.FAILED, 0, True  # 上传失败
 
         file_id = result["text"][0]["id"]
+        self._cache_call('invalidate_folder', folder_id, 'file')
         self.set_passwd(file_id)  # 文件上传后默认关闭提取码
-        if need_delete:
-            file_.close()
-            os.remove(file_path)
         return LanZouCloud.SUCCESS, int(file_id), True
 
     def _upload_big_file(self, task: object, file_path, dir_id, callback=None):
         """上传大文件, 且使得回调函数只显示一个文件"""
         file_size = os.path.getsize(file_path)  # 原始文件的字节大小
         file_name = os.path.basename(file_path)
-        tmp_dir = os.path.dirname(file_path) + os.sep + '__' + '.'.join(file_name.split('.')[:-1])  # 临时文件保存路径
+        tmp_dir = os.path.dirname(file_path) + os.sep + '__' + '.'.join(file_name.split('.')[:-1])  # 记录文件保存路径
         record_file = tmp_dir + os.sep + file_name + '.record'  # 记录文件，大文件没有完全上传前保留，用于支持续传
-        uploaded_size = 0  # 记录已上传字节数，用于回调函数
 
         if not os.path.exists(tmp_dir):
             os.makedirs(tmp_dir)
-        if not os.path.exists(record_file):  # 初始化记录文件
-            info = {'name': file_name, 'size': file_size, 'uploaded': 0, 'parts': []}
+        if not os.path.exists(record_file):  # 初始化记录文件，拆分方案事先确定，续传时保持不变
+            info = {'name': file_name, 'size': file_size, 'uploaded': 0, 'parts': [],
+                    'plan': big_file_plan(file_path, self._max_size)}
             with open(record_file, 'wb') as f:
                 pickle.dump(info, f)
         else:
             with open(record_file, 'rb') as f:
                 info = pickle.load(f)
-                uploaded_size = info['uploaded']  # 读取已经上传的大小
-                logger.debug(f"Find upload record: {uploaded_size}/{file_size}")
-
-        # def _callback(now_size):  # 重新封装回调函数，隐藏数据块上传细节
-        #     nonlocal uploaded_size
-        #     if callback is not None:
-        #         # MultipartEncoder 以后,文件数据流比原文件略大几百字节, now_size 略大于 file_size
-        #         now_size = uploaded_size + now_size
-        #         task.now_size = now_size if now_size < task.total_size else task.total_size  # 99.99% -> 100.00%
-        #         callback()
-
-        while uploaded_size < file_size:
-            data_size, data_path = big_file_split(file_path, self._max_size, start_byte=uploaded_size)
-            code, _, _ = self._upload_small_file(task, data_path, dir_id, callback)
-            if code == LanZouCloud.SUCCESS:
-                uploaded_size += data_size  # 更新已上传的总字节大小
-                info['uploaded'] = uploaded_size
-                info['parts'].append(os.path.basename(data_path))  # 记录已上传的文件名
-                with open(record_file, 'wb') as f:
-                    logger.debug(f"Update record file: {uploaded_size}/{file_size}")
-                    pickle.dump(info, f)
-            else:
-                logger.debug(f"Upload data file failed: code={code}, data_path={data_path}")
+            logger.debug(f"Find upload record: {info['uploaded']}/{file_size}")
+            if 'plan' not in info:  # 旧版记录文件没有拆分方案，剩余部分重新拆分
+                info['plan'] = big_file_plan(file_path, self._max_size, start_byte=info['uploaded'])
+
+        for data_name, start, data_size in info['plan']:
+            if start < info['uploaded']:  # 已经上传的数据块
+                continue
+            data = FileSlice(file_path, start, data_size)  # 直接读取源文件对应区间，不生成临时文件
+            code, _, _ = self._upload_stream(task, data_name, data, dir_id, callback)
+            if code != LanZouCloud.SUCCESS:
+                logger.debug(f"Upload data block failed: code={code}, data_name={data_name}")
                 return LanZouCloud.FAILED, 0, False
-            os.remove(data_path)  # 删除临时数据块
+            info['uploaded'] = start + data_size  # 更新已上传的总字节大小
+            info['parts'].append(data_name)  # 记录已上传的文件名
+            with open(record_file, 'wb') as f:
+                logger.debug(f"Update record file: {info['uploaded']}/{file_size}")
+                pickle.dump(info, f)
             min_s, max_s = self._upload_delay  # 设置两次上传间的延时，减小封号可能性
             sleep_time = uniform(min_s, max_s)
             logger.debug(f"Sleeping, Upload task will resume after {sleep_time:.2f}s...")
             sleep(sleep_time)
 
-        # 全部数据块上传完成
+        # 全部数据块上传完成，上传记录文件(不含拆分方案, parts 需在最后)
+        record = {k: v for k, v in info.items() if k != 'plan'}
         record_name = list(file_name.replace('.', ''))  # 记录文件名也打乱
         shuffle(record_name)
         record_name = name_format(''.join(record_name)) + '.txt'
-        record_file_new = tmp_dir + os.sep + record_name
-        os.rename(record_file, record_file_new)
-        code, _, _ = self._upload_small_file(task, record_file_new, dir_id, callback)  # 上传记录文件
+        record_data = BytesIO(pickle.dumps(record))
+        code, _, _ = self._upload_stream(task, record_name, record_data, dir_id, callback)  # 上传记录文件
         if code != LanZouCloud.SUCCESS:
-            logger.error(f"Upload record file failed: code={code}, record_file={record_file_new}")
+            logger.error(f"Upload record file failed: code={code}, record_file={record_file}")
             return LanZouCloud.FAILED, 0, False
-        # 记录文件上传成功，删除临时文件
+        # 记录文件上传成功，删除临时文件夹
         shutil.rmtree(tmp_dir)
         logger.debug(f"Upload finished, Delete tmp folder:{tmp_dir}")
         return LanZouCloud.SUCCESS, int(dir_id), False  # 大文件返回文件夹id
 
-    def upload_file(self, task: object, file_path, folder_id=-1, callback=None, allow_big_file=False) -> Tuple[int, int, bool]:
+    def upload_file(self, task: object, file_path, folder_id=-1, callback=None, allow_big_file=False,
+                    exist_files=None) -> Tuple[int, int, bool]:
         """解除限制上传文件"""
         if not os.path.isfile(file_path):
             return LanZouCloud.PATH_ERROR, 0, True
@@ -911,7 +1261,7 @@ class LanZouCloud(object):
         if file_size == 0:  # 空文件无法上传
             return LanZouCloud.FAILED, 0, False
         elif file_size <= self._max_size * 1048576:  # 单个文件不超过 max_size 直接上传
-            return self._upload_small_file(task, file_path, folder_id, callback)
+            return self._upload_small_file(task, file_path, folder_id, callback, exist_files)
         elif not allow_big_file:
             logger.debug(f'Forbid upload big file！file_path={file_path}, max_size={self._max_size}')
             task.info = f"文件大于{self._max_size}MB" # LanZouCloud.OFFICIAL_LIMITED
@@ -924,13 +1274,12 @@ class LanZouCloud(object):
             return LanZouCloud.MKDIR_ERROR, 0, False  # 创建文件夹失败就退出
         return self._upload_big_file(task, file_path, dir_id, callback)
 
-    def upload_dir(self, task: object, callback, allow_big_file=False):
+    def upload_dir(self, task: object, callback, allow_big_file=False, recursive=False):
         #  dir_path, folder_id=-1, callback=None, failed_callback=None, allow_big_file=False):
-        """批量上传文件夹中的文件(不会递归上传子文件夹)
-        :param folder_id: 网盘文件夹 id
-        :param dir_path: 文件夹路径
-        :param callback (filename, total_size, now_size) 用于显示进度
-        :param failed_callback (code, file) 用于处理上传失败的文件
+        """批量上传文件夹中的文件，多个文件并发上传
+        :param task: 上传任务, task.url 为本地文件夹路径, task.fid 为网盘文件夹 id
+        :param callback 用于显示进度
+        :param recursive: 是否递归上传子文件夹，网盘中按相同的目录结构创建文件夹
         """
         if not os.path.isdir(task.url):
             task.info = LanZouCloud.PATH_ERROR
@@ -942,18 +1291,49 @@ class LanZouCloud(object):
             task.info = LanZouCloud.MKDIR_ERROR
             return LanZouCloud.MKDIR_ERROR, None, False
 
+        files = []  # (本地文件路径, 子文件夹相对路径)
+        sub_dirs = []
+        for root, dirs, names in os.walk(task.url):
+            rel_dir = os.path.relpath(root, task.url)
+            rel_dir = '' if rel_dir == '.' else rel_dir
+            files.extend((os.path.join(root, name), rel_dir) for name in sorted(names))
+            if not recursive:
+                break  # 跳过子文件夹
+            dirs.sort()
+            sub_dirs.extend(os.path.join(rel_dir, d) for d in dirs)
+        dir_ids, created = self._mkdir_tree(dir_id, sub_dirs, '批量上传') if sub_dirs else ({'': dir_id}, set())
+
+        # 每个文件夹的远程文件列表只获取一次，该文件夹下的所有文件共用这份索引检查重名
         # the default value of task.current is 1
         task.current = 0
-        for filename in os.listdir(task.url):
-            file_path = task.url + os.sep + filename
-            if not os.path.isfile(file_path):
-                continue  # 跳过子文件夹
-            task.current += 1
-            code, _, _ = self.upload_file(task, file_path, dir_id, callback=callback,
-                                          allow_big_file=allow_big_file)
-            # if code != LanZouCloud.SUCCESS:
-            #     if failed_callback is not None:
-            #         failed_callback(code, filename)
+        exist_files = {fid: {} for fid in created}
+        pace_lock = Lock()
+        next_start = 0
+
+        def _upload(file_path, rel_dir):
+            nonlocal next_start
+            folder_id = dir_ids.get(rel_dir)
+            if folder_id is None:  # 网盘中对应的文件夹创建失败(如超过层级限制)
+                return LanZouCloud.MKDIR_ERROR, 0, True
+            with pace_lock:  # 相邻两个文件开始上传的时间间隔不小于 _upload_delay
+                if folder_id not in exist_files:
+                    exist_files[folder_id] = {f.name: f for f in self.get_file_list(folder_id)}
+                sleep(max(next_start - time(), 0))
+                next_start = time() + uniform(*self._upload_delay)
+                task.current += 1
+            return self.upload_file(task, file_path, folder_id, allow_big_file=allow_big_file,
+                                    exist_files=exist_files[folder_id])
+
+        ex = ThreadPoolExecutor(max_workers=self._up_threads)
+        tasks = {ex.submit(_upload, *f): f[0] for f in files}
+        try:
+            self._wait_tasks(list(tasks), callback)
+        finally:
+            ex.shutdown(wait=True)
+        for t, file_path in tasks.items():
+            code, _, _ = t.result()  # 子线程里的 TimeoutError 在此抛出
+            if code != LanZouCloud.SUCCESS:
+                logger.debug(f"Upload file failed: code={code}, file_path={file_path}")
         return LanZouCloud.SUCCESS, dir_id, False
 
     def down_file_by_url(self, share_url, task: object, callback) -> int:
@@ -964,13 +1344,17 @@ class LanZouCloud(object):
         if not os.path.exists(task.path):
             os.makedirs(task.path)
 
-        info = self.get_durl_by_url(share_url, task.pwd)
-        if info.code != LanZouCloud.SUCCESS:
-            task.info = info.code
-            logger.error(f'File direct url info: {info}')
-            return info.code
-
-        resp = self._get(info.durl, stream=True)
+        for _ in range(2):  # 缓存的直链已经失效时重新解析一次
+            info = self.get_durl_by_url(share_url, task.pwd)
+            if info.code != LanZouCloud.SUCCESS:
+                task.info = info.code
+                logger.error(f'File direct url info: {info}')
+                return info.code
+            resp = self._get(info.durl, stream=True)
+            if resp is None or resp.status_code not in (403, 410):
+                break
+            resp.close()
+            self._durl_cache.invalidate(share_url, task.pwd)
         if not resp:
             task.info = LanZouCloud.NETWORK_ERROR
             return LanZouCloud.NETWORK_ERROR
@@ -980,63 +1364,50 @@ class LanZouCloud(object):
         # 这时候我们先读取一点数据, 再尝试获取一次, 通常只需读取 1 字节数据
         content_length = resp.headers.get('Content-Length', None)
         if not content_length:
-            data_iter = resp.iter_content(chunk_size=1)
             max_retries = 5  # 5 次拿不到就算了
             while not content_length and max_retries > 0:
                 max_retries -= 1
                 logger.warning("Not found Content-Length in response headers")
                 logger.debug("Read 1 byte from stream...")
                 try:
-                    next(data_iter)  # 读取一个字节
+                    next(resp.iter_content(chunk_size=1))  # 读取一个字节
                 except StopIteration:
                     logger.debug("Please wait for a moment before downloading")
                     return LanZouCloud.FAILED
-                resp_ = self._get(info.durl, stream=True)  # 再请求一次试试
-                if not resp_:
+                resp.close()
+                resp = self._get(info.durl, stream=True)  # 再请求一次试试
+                if not resp:
                     return LanZouCloud.FAILED
-                content_length = resp_.headers.get('Content-Length', None)
+                content_length = resp.headers.get('Content-Length', None)
                 logger.debug(f"Content-Length: {content_length}")
 
         total_size = int(content_length)
+        accept_ranges = resp.headers.get('Accept-Ranges', '') == 'bytes'
+        resp.close()  # 只用到了响应头，释放连接
 
         if share_url == task.url:  # 下载单文件
             task.total_size = total_size
         file_path = task.path + os.sep + info.name.replace("*", "_")  # 替换文件名中的 *
         logger.debug(f'Save file to file_path={file_path}')
-        now_size = 0
-        if os.path.exists(file_path):
-            now_size = os.path.getsize(file_path)  # 本地已经下载的文件大小
-            task.now_size += now_size
+        if os.path.exists(file_path + '.record'):  # 存在分段下载记录，继续分段下载
+            code = self._down_by_segments(info.durl, file_path, total_size, task, callback)
+        elif os.path.exists(file_path) and os.path.getsize(file_path) >= total_size:
+            task.now_size += total_size
             callback()
-            if now_size >= total_size:
-                logger.debug(f'File file_path={file_path} local already exist!')
-                return LanZouCloud.SUCCESS
-
-        chunk_size = 1024 * 64  # 4096
-        last_512_bytes = b''  # 用于识别文件是否携带真实文件名信息
-        headers = {**self._headers, 'Range': 'bytes=%d-' % now_size}
-        resp = self._get(info.durl, stream=True, headers=headers, timeout=None)
-
-        if resp is None:  # 网络异常
-            task.info = LanZouCloud.NETWORK_ERROR
-            return LanZouCloud.FAILED
-        if resp.status_code == 416:  # 已经下载完成
-            logger.debug('File download finished!')
+            logger.debug(f'File file_path={file_path} local already exist!')
             return LanZouCloud.SUCCESS
+        elif accept_ranges and self._dl_segments > 1 and total_size >= 2 * self._segment_min:
+            code = self._down_by_segments(info.durl, file_path, total_size, task, callback)
+        else:
+            code = self._down_by_stream(info.durl, file_path, total_size, task, callback)
+        if code != LanZouCloud.SUCCESS:
+            task.info = code
+            return code
 
-        logger.debug(f'File downloading file_path={file_path} ...')
-        with open(file_path, "ab") as f:
-            for chunk in resp.iter_content(chunk_size):
-                if chunk:
-                    f.write(chunk)
-                    f.flush()
-                    now_size += len(chunk)
-                    task.now_size += len(chunk)
-                    callback()
-                    if total_size - now_size < 512:
-                        last_512_bytes += chunk
         # 尝试解析文件报尾
-        file_info = un_serialize(last_512_bytes[-512:])
+        with open(file_path, 'rb') as f:
+            f.seek(max(total_size - 512, 0))
+            file_info = un_serialize(f.read(512))
         if file_info is not None and 'padding' in file_info:  # 大文件的记录文件也可以反序列化出 name,但是没有 padding
             real_name = file_info['name']
             new_file_path = task.path + os.sep + real_name
@@ -1049,31 +1420,181 @@ class LanZouCloud(object):
                 f.truncate()
         return LanZouCloud.SUCCESS
 
-    def get_folder_info_by_url(self, share_url, dir_pwd='') -> FolderDetail():
-        """获取文件夹里所有文件的信息"""
-        if is_file_url(share_url):
-            return FolderDetail(LanZouCloud.URL_INVALID)
+    def _down_by_stream(self, durl, file_path, total_size, task: object, callback) -> int:
+        """单连接下载，支持从本地已有数据的末尾续传，传输中断后退避重试并从断点继续"""
+        now_size = 0
+        if os.path.exists(file_path):
+            now_size = os.path.getsize(file_path)  # 本地已经下载的文件大小
+            task.now_size += now_size
+            callback()
+
+        chunk_size = 1024 * 64  # 4096
+        attempts = self._retry_policy['stream'][0]
+        for attempt in range(attempts):
+            if attempt > 0:
+                self._backoff('stream', attempt - 1)
+            headers = {**self._headers, 'Range': 'bytes=%d-' % now_size}
+            try:  # 读数据超时后重新请求，而不是一直等待
+                resp = self._get(durl, retry=None, stream=True, headers=headers, timeout=(self._timeout, 60))
+            except TimeoutError:
+                resp = None
+            if resp is None:  # 网络异常
+                continue
+            if resp.status_code in (403, 410):  # 直链已经失效
+                resp.close()
+                self._durl_cache.invalidate_durl(durl)
+                return LanZouCloud.FAILED
+            if resp.status_code == 416:  # 已经下载完成
+                resp.close()
+                logger.debug('File download finished!')
+                return LanZouCloud.SUCCESS
+
+            mode = 'ab'
+            if resp.status_code == 200 and now_size > 0:  # 服务器忽略了 Range，从头下载
+                task.now_size -= now_size
+                now_size, mode = 0, 'wb'
+            logger.debug(f'File downloading file_path={file_path} ...')
+            try:
+                with open(file_path, mode) as f:
+                    for chunk in resp.iter_content(chunk_size):
+                        if chunk:
+                            f.write(chunk)
+                            now_size += len(chunk)
+                            task.now_size += len(chunk)
+                            callback()
+            except (requests.RequestException, ConnectionError, TimeoutError) as e:
+                logger.debug(f"Download interrupted at {now_size}: e={e}")
+                continue
+            finally:
+                resp.close()
+            if not total_size or now_size >= total_size:
+                return LanZouCloud.SUCCESS
+        return LanZouCloud.NETWORK_ERROR
+
+    def _down_range(self, durl, fd, seg, lock, task: object, base=0) -> int:
+        """下载 durl 的一段数据并按偏移写入 fd，传输中断后退避重试并从断点继续
+        :param seg: [当前写入位置, 结束位置(不含)]，文件中的偏移，下载过程中原地更新
+        :param base: durl 第一个字节在文件中的偏移
+        """
+        attempts = self._retry_policy['stream'][0]
+        for attempt in range(attempts):
+            if attempt > 0:
+                self._backoff('stream', attempt - 1)
+            headers = {**self._headers, 'Range': 'bytes=%d-%d' % (seg[0] - base, seg[1] - base - 1)}
+            try:
+                resp = self._get(durl, retry=None, stream=True, headers=headers, timeout=(self._timeout, 60))
+            except TimeoutError:
+                resp = None
+            if resp is None:
+                continue
+            try:
+                if resp.status_code in (403, 410):  # 直链已经失效
+                    self._durl_cache.invalidate_durl(durl)
+                    return LanZouCloud.FAILED
+                if resp.status_code != 206:  # 服务器不支持 Range
+                    logger.debug(f"Range {seg} response status: {resp.status_code}")
+                    return LanZouCloud.FAILED
+                for chunk in resp.iter_content(1024 * 64):
+                    if not chunk:
+                        continue
+                    chunk = chunk[:seg[1] - seg[0]]
+                    write_at(fd, chunk, seg[0], lock)
+                    with lock:
+                        seg[0] += len(chunk)
+                        task.now_size += len(chunk)
+                    if seg[0] >= seg[1]:
+                        break
+            except (requests.RequestException, ConnectionError, TimeoutError) as e:
+                logger.debug(f"Range {seg} interrupted: e={e}")
+            finally:
+                resp.close()
+            if seg[0] >= seg[1]:
+                return LanZouCloud.SUCCESS
+        return LanZouCloud.NETWORK_ERROR
+
+    @staticmethod
+    def _wait_tasks(tasks, callback=None, on_tick=None):
+        """在调用线程中等待子线程全部结束，期间定时回调，避免在子线程里调用回调函数"""
+        not_done = tasks
+        while not_done:
+            _, not_done = wait(not_done, timeout=0.5)
+            if callback is not None:
+                callback()
+            if on_tick is not None:
+                on_tick()
+
+    def _down_by_segments(self, durl, file_path, total_size, task: object, callback) -> int:
+        """多连接分段下载，各段按偏移写入预分配的文件
+        每段的下载进度保存在 .record 文件中，续传时只下载未完成的部分
+        """
+        record_file = file_path + '.record'
+        info = None
+        if os.path.exists(record_file) and os.path.exists(file_path):
+            with open(record_file, 'rb') as rf:
+                info = pickle.load(rf)
+            logger.debug(f"Find download record file: {info}")
+            if info.get('size') != total_size:  # 远端文件发生了变化，重新下载
+                info = None
+        if info is None:
+            done_size = 0
+            if os.path.exists(file_path):  # 单连接下载中断时留下的数据作为已完成部分
+                done_size = min(os.path.getsize(file_path), total_size)
+            segments = split_segments(done_size, total_size, self._dl_segments, self._segment_min)
+            info = {'size': total_size, 'segments': segments}
+            with open(file_path, 'ab') as f:
+                f.truncate(total_size)  # 预分配文件空间
+        segments = info['segments']
+        task.now_size += total_size - sum(end - pos for pos, end in segments)
+        callback()
+
+        lock = Lock()
+
+        def _save_record():
+            with lock:
+                data = {'size': total_size, 'segments': [seg[:] for seg in segments]}
+            with open(record_file, 'wb') as rf:
+                pickle.dump(data, rf)
+
+        pending = [seg for seg in segments if seg[0] < seg[1]]
+        logger.debug(f'File downloading file_path={file_path}, segments={pending}')
+        fd = os.open(file_path, os.O_WRONLY | getattr(os, 'O_BINARY', 0))
+        ex = ThreadPoolExecutor(max_workers=max(len(pending), 1))
+        tasks = [ex.submit(self._down_range, durl, fd, seg, lock, task) for seg in pending]
         try:
-            html = requests.get(share_url, headers=self._headers).text
-        except requests.RequestException as e:
-            logger.error(f"requests error: {e}")
-            return FolderDetail(LanZouCloud.NETWORK_ERROR)
+            self._wait_tasks(tasks, callback, _save_record)
+        finally:
+            ex.shutdown(wait=True)
+            os.close(fd)
+            _save_record()
+
+        for t in tasks:
+            code = t.result()  # 子线程里的 TimeoutError 在此抛出
+            if code != LanZouCloud.SUCCESS:
+                return code
+        logger.debug(f"Delete download record file: {record_file}")
+        os.remove(record_file)
+        return LanZouCloud.SUCCESS
+
+    def _crawl_folder(self, share_url, dir_pwd='', pages=None):
+        """获取分享文件夹(不含子文件夹)的信息与全部文件
+        :param pages: 每获取一页文件就放入 (share_url, 该页文件) 的队列，为 None 时不放入
+        :return (状态码, {'name', 'id', 'time', 'desc', 'files', 'sub_urls'})
+        """
+        try:
+            html = self._get(share_url)
+        except TimeoutError:
+            html = None
+        if not html:
+            return LanZouCloud.NETWORK_ERROR, None
+        html = html.text
         if any(item in html for item in ["文件不存在", "文件取消"]):
-            return FolderDetail(LanZouCloud.FILE_CANCELLED)
+            return LanZouCloud.FILE_CANCELLED, None
         if ('id="pwdload"' in html or 'id="passwddiv"' in html or '请输入密码' in html) and len(dir_pwd) == 0:
-            return FolderDetail(LanZouCloud.LACK_PASSWORD)
-
-        if "acw_sc__v2" in html:
-            # 在页面被过多访问或其他情况下，有时候会先返回一个加密的页面，其执行计算出一个acw_sc__v2后放入页面后再重新访问页面才能获得正常页面
-            # 若该页面进行了js加密，则进行解密，计算acw_sc__v2，并加入cookie
-            acw_sc__v2 = calc_acw_sc__v2(html)
-            self._session.cookies.set("acw_sc__v2", acw_sc__v2)
-            logger.debug(f"Set Cookie: acw_sc__v2={acw_sc__v2}")
-            html = self._get(share_url).text  # 文件分享页面(第一页)
+            return LanZouCloud.LACK_PASSWORD, None
 
         try:
             # 获取文件需要的参数
-            html = remove_notes(html)
+            html = parser.strip_notes(html)
             lx = re.findall(r"'lx':'?(\d)'?,", html)[0]
             t = re.findall(r"var [0-9a-z]{6} = '(\d{10})';", html)[0]
             k = re.findall(r"var [0-9a-z]{6} = '([0-9a-z]{15,})';", html)[0]
@@ -1091,27 +1612,26 @@ class LanZouCloud(object):
             folder_desc = folder_desc.group(1) if folder_desc else ''
         except IndexError:
             logger.error("IndexError")
-            return FolderDetail(LanZouCloud.FAILED)
+            return LanZouCloud.FAILED, None
 
-        # 提取子文件夹信息(vip用户分享的文件夹可以递归包含子文件夹)
-        sub_folders = FolderList()
+        # 子文件夹链接(vip用户分享的文件夹可以递归包含子文件夹)
         # 文件夹描述放在 filesize 一栏, 迷惑行为
         all_sub_folders = re.findall(
             r'mbxfolder"><a href="(.+?)".+class="filename">(.+?)<div class="filesize">(.*?)</div>', html)
-        for url, _, _ in all_sub_folders:
-            url = self._host_url + url
-            sub_forder_detail = self.get_folder_info_by_url(url, dir_pwd)
-            sub_folders.append(sub_forder_detail)
+        sub_urls = [self._host_url + url for url, _, _ in all_sub_folders]
 
-        # 提取改文件夹下全部文件
+        # 提取该文件夹下全部文件
         page = 1
+        retries = 0
         files = FileList()
         while True:
+            page_start = len(files)
+            net_error = False
             try:
                 post_data = {'lx': lx, 'pg': page, 'k': k, 't': t, 'fid': folder_id, 'pwd': dir_pwd}
-                resp = self._post(self._host_url + '/filemoreajax.php', data=post_data, headers=self._headers).json()
-            except requests.RequestException:
-                return FolderDetail(LanZouCloud.NETWORK_ERROR)
+                resp = self._post(self._host_url + '/filemoreajax.php', data=post_data, retry='read').json()
+            except (requests.RequestException, TimeoutError, AttributeError, ValueError):
+                resp, net_error = {'zt': 4}, True  # 网络异常，与 zt=4 一样稍后重试
             if resp['zt'] == 1:  # 成功获取一页文件信息
                 for f in resp["text"]:
                     name = f['name_all'].replace("&amp;", "&")
@@ -1125,34 +1645,89 @@ class LanZouCloud(object):
                             type=f["name_all"].split('.')[-1],  # 文件格式
                             url=self._host_url + "/" + f["id"]  # 文件分享链接
                         ))
+                if pages is not None and len(files) > page_start:
+                    pages.put((share_url, files[page_start:]))
                 page += 1  # 下一页
-                continue
+                retries = 0
             elif resp['zt'] == 2:  # 已经拿到全部的文件信息
                 break
             elif resp['zt'] == 3:  # 提取码错误
-                return FolderDetail(LanZouCloud.PASSWORD_ERROR)
-            elif resp["zt"] == 4:
-                continue
+                return LanZouCloud.PASSWORD_ERROR, None
+            elif resp["zt"] == 4:  # 请求过快或者网络异常，退避后重试
+                if not net_error:
+                    self._throttled()
+                if retries + 1 >= self._retry_policy['read'][0]:
+                    return LanZouCloud.NETWORK_ERROR, None
+                self._backoff('read', retries)
+                retries += 1
             else:
-                return FolderDetail(LanZouCloud.FAILED)  # 其它未知错误
-        # 通过文件的时间信息补全文件夹的年份(如果有文件的话)
-        if files:  # 最后一个文件上传时间最早，文件夹的创建年份与其相同
-            if folder_time:
-                folder_time = files[-1].time.split('-')[0] + '-' + folder_time
-            else:  # 没有时间就取第一个文件日期
-                folder_time = files[-1].time
-            size_int = sum_files_size(files)
-            count = len(files)
-        else:  # 可恶，没有文件，日期就设置为今年吧
-            folder_time = datetime.today().strftime('%Y-%m-%d')
-            size_int = count = 0
-        for sub_folder in sub_folders:  # 将子文件夹文件大小数量信息透传到父文件夹
-            size_int += sub_folder.folder.size_int
-            count += sub_folder.folder.count
-        folder_size = convert_file_size_to_str(size_int)
-        this_folder = FolderInfo(folder_name, folder_id, dir_pwd, folder_time,
-                                 folder_desc, share_url, folder_size, size_int, count)
-        return FolderDetail(LanZouCloud.SUCCESS, folder=this_folder, files=files, sub_folders=sub_folders)
+                return LanZouCloud.FAILED, None  # 其它未知错误
+        return LanZouCloud.SUCCESS, {'name': folder_name, 'id': folder_id, 'time': folder_time,
+                                     'desc': folder_desc, 'files': files, 'sub_urls': sub_urls}
+
+    def get_folder_info_by_url(self, share_url, dir_pwd='', max_depth=4, callback=None) -> FolderDetail():
+        """获取文件夹里所有文件的信息
+        子文件夹由线程池并发获取，max_depth 为最多深入的子文件夹层数
+        :param callback: callback(folder_url, files) 每获取一页文件调用一次(在调用线程中)，用于提前展示
+        """
+        if is_file_url(share_url):
+            return FolderDetail(LanZouCloud.URL_INVALID)
+
+        results = {}  # {url: (状态码, 文件夹信息)}
+        pages = Queue() if callback is not None else None
+        with ThreadPoolExecutor(max_workers=self._crawl_threads) as ex:
+            pending = {ex.submit(self._crawl_folder, share_url, dir_pwd, pages): (share_url, 0)}
+            while pending:
+                done, _ = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+                while pages is not None and not pages.empty():
+                    callback(*pages.get())
+                for task in done:
+                    url, depth = pending.pop(task)
+                    results[url] = task.result()
+                    code, node = results[url]
+                    if code != LanZouCloud.SUCCESS:
+                        if url == share_url:  # 分享的文件夹本身无法获取
+                            return FolderDetail(code)
+                        logger.debug(f"Get sub folder failed: code={code}, url={url}")
+                        continue
+                    if depth >= max_depth:
+                        node['sub_urls'] = []
+                        continue
+                    node['sub_urls'] = [u for u in node['sub_urls'] if u not in results]
+                    for sub_url in node['sub_urls']:
+                        results[sub_url] = None  # 占位，防止重复获取
+                        pending[ex.submit(self._crawl_folder, sub_url, dir_pwd, pages)] = (sub_url, depth + 1)
+
+        def _build(url) -> FolderDetail:
+            """由子文件夹向上组装 FolderDetail"""
+            code, node = results[url]
+            if code != LanZouCloud.SUCCESS:
+                return FolderDetail(code)
+            files = node['files']
+            sub_folders = FolderList()
+            for sub_url in node['sub_urls']:
+                sub_folders.append(_build(sub_url))
+            # 通过文件的时间信息补全文件夹的年份(如果有文件的话)
+            folder_time = node['time']
+            if files:  # 最后一个文件上传时间最早，文件夹的创建年份与其相同
+                if folder_time:
+                    folder_time = files[-1].time.split('-')[0] + '-' + folder_time
+                else:  # 没有时间就取第一个文件日期
+                    folder_time = files[-1].time
+                size_int = sum_files_size(files)
+                count = len(files)
+            else:  # 可恶，没有文件，日期就设置为今年吧
+                folder_time = datetime.today().strftime('%Y-%m-%d')
+                size_int = count = 0
+            for sub_folder in sub_folders:  # 将子文件夹文件大小数量信息透传到父文件夹
+                size_int += sub_folder.folder.size_int
+                count += sub_folder.folder.count
+            folder_size = convert_file_size_to_str(size_int)
+            this_folder = FolderInfo(node['name'], node['id'], dir_pwd, folder_time,
+                                     node['desc'], url, folder_size, size_int, count)
+            return FolderDetail(LanZouCloud.SUCCESS, folder=this_folder, files=files, sub_folders=sub_folders)
+
+        return _build(share_url)
 
     def get_folder_info_by_id(self, folder_id):
         """通过 id 获取文件夹及内部文件信息"""
@@ -1185,8 +1760,31 @@ class LanZouCloud(object):
         logger.debug("Big file checking: Failed")
         return None
 
+    def _resolve_part(self, file, retry=True) -> Tuple[int, str, int]:
+        """获取分段数据文件的下载直链与字节大小"""
+        try:
+            durl_info = self.get_durl_by_url(file.url)  # 分段文件无密码
+        except AttributeError:
+            durl_info = self.get_durl_by_id(file.id)
+        if durl_info.code != LanZouCloud.SUCCESS:
+            logger.debug(f"Can't get direct url: {file}")
+            return durl_info.code, '', 0
+        resp = self._get(durl_info.durl, stream=True)
+        if resp is not None and resp.status_code in (403, 410):  # 缓存的直链已经失效，重新解析
+            resp.close()
+            self._durl_cache.invalidate_durl(durl_info.durl)
+            if retry:
+                return self._resolve_part(file, False)
+            return LanZouCloud.FAILED, '', 0
+        if resp is None:
+            return LanZouCloud.NETWORK_ERROR, '', 0
+        size = int(resp.headers.get('Content-Length', 0))
+        resp.close()
+        return LanZouCloud.SUCCESS, durl_info.durl, size
+
     def _down_big_file(self, name, total_size, file_list, task: object, callback):
         """下载分段数据到一个文件，回调函数只显示一个文件
+        先并发解析所有分段的直链，再并发下载各分段，按偏移写入预分配的文件
         支持大文件下载续传，下载完成后重复下载不会执行覆盖操作，直接返回状态码 SUCCESS
         """
         big_file = task.path + os.sep + name
@@ -1195,70 +1793,86 @@ class LanZouCloud(object):
         if not os.path.exists(task.path):
             os.makedirs(task.path)
 
-        if not os.path.exists(record_file):  # 初始化记录文件
-            info = {'last_ending': 0, 'finished': []}  # 记录上一个数据块结尾地址和已经下载的数据块
-            with open(record_file, 'wb') as rf:
-                pickle.dump(info, rf)
-        else:  # 读取记录文件，下载续传
+        task.total_size = total_size
+        if os.path.exists(record_file):  # 读取记录文件，下载续传
             with open(record_file, 'rb') as rf:
                 info = pickle.load(rf)
-                file_list = [f for f in file_list if f.name not in info['finished']]  # 排除已下载的数据块
-                logger.debug(f"Find download record file: {info}")
-
-        task.total_size = total_size
-        if os.path.exists(big_file):
-            now_size = os.path.getsize(big_file)  # 本地已经下载的文件大小
-            task.now_size += now_size
+            info.setdefault('sizes', {})  # 旧版记录文件没有分段大小
+            logger.debug(f"Find download record file: {info}")
+        elif os.path.exists(big_file) and os.path.getsize(big_file) >= total_size:
+            task.now_size += total_size
             if callback is not None:
                 callback()
-            if now_size >= total_size:
-                logger.debug(f'File file_path={big_file} local already exist!')
-                # 全部数据块下载完成, 记录文件可以删除
-                logger.debug(f"Delete download record file: {record_file}")
-                os.remove(record_file)
-                return LanZouCloud.SUCCESS
+            logger.debug(f'File file_path={big_file} local already exist!')
+            return LanZouCloud.SUCCESS
+        else:  # 初始化记录文件, 记录已经下载的数据块与各数据块大小
+            info = {'finished': [], 'sizes': {}}
+
+        # 并发获取各数据块的直链，已知大小的已完成数据块不需要再请求
+        pending = [f for f in file_list if f.name not in info['finished']]
+        to_resolve = pending + [f for f in file_list if f.name not in info['sizes'] and f not in pending]
+        durls = {}
+        ex = ThreadPoolExecutor(max_workers=max(min(self._dl_segments, len(to_resolve)), 1))
+        tasks = {ex.submit(self._resolve_part, f): f for f in to_resolve}
+        for t in as_completed(tasks):
+            code, durl, size = t.result()
+            if code != LanZouCloud.SUCCESS or not size:
+                ex.shutdown(wait=False)
+                return code if code != LanZouCloud.SUCCESS else LanZouCloud.FAILED
+            durls[tasks[t].name] = durl
+            info['sizes'][tasks[t].name] = size
+        ex.shutdown(wait=True)
+
+        offsets = {}  # 各数据块在大文件中的起始位置
+        pos = 0
+        for f in file_list:
+            offsets[f.name] = pos
+            pos += info['sizes'][f.name]
+        if pos != total_size:
+            logger.error(f"Big file size mismatch: {pos} != {total_size}")
+            return LanZouCloud.FAILED
 
         with open(big_file, 'ab') as bf:
-            for file in file_list:
-                try:
-                    durl_info = self.get_durl_by_url(file.url)  # 分段文件无密码
-                except AttributeError:
-                    durl_info = self.get_durl_by_id(file.id)
-                if durl_info.code != LanZouCloud.SUCCESS:
-                    logger.debug(f"Can't get direct url: {file}")
-                    return durl_info.code
-                # 准备向大文件写入数据
-                file_size_now = os.path.getsize(big_file)
-                down_start_byte = file_size_now - info['last_ending']  # 当前数据块上次下载中断的位置
-                headers = {**self._headers, 'Range': 'bytes=%d-' % down_start_byte}
-                logger.debug(f"Download {file.name}, Range: {down_start_byte}-")
-                resp = self._get(durl_info.durl, stream=True, headers=headers)
-
-                if resp is None:  # 网络错误, 没有响应数据
-                    return LanZouCloud.FAILED
-                if resp.status_code == 416:  # 下载完成后重复下载导致 Range 越界, 服务器返回 416
-                    logger.debug(f"File {name} has already downloaded.")
-                    os.remove(record_file)  # 删除记录文件
-                    return LanZouCloud.SUCCESS
-                try:
-                    for chunk in resp.iter_content(4096):
-                        if chunk:
-                            file_size_now += len(chunk)
-                            bf.write(chunk)
-                            bf.flush()  # 确保缓冲区立即写入文件，否则下一次写入时获取的文件大小会有偏差
-                            task.now_size = file_size_now
-                            callback()
-
-                    # 一块数据写入完成，更新记录文件
-                    info['finished'].append(file.name)
-                finally:
-                    info['last_ending'] = file_size_now
-                    with open(record_file, 'wb') as rf:
-                        pickle.dump(info, rf)
-                    logger.debug(f"Update download record info: {info}")
-            # 全部数据块下载完成, 记录文件可以删除
-            logger.debug(f"Delete download record file: {record_file}")
-            os.remove(record_file)
+            if os.path.getsize(big_file) < total_size:
+                bf.truncate(total_size)  # 预分配文件空间
+        task.now_size += sum(info['sizes'][n] for n in info['finished'])
+        lock = Lock()
+
+        def _save_record():
+            with lock:
+                data = {'finished': info['finished'][:], 'sizes': dict(info['sizes'])}
+            with open(record_file, 'wb') as rf:
+                pickle.dump(data, rf)
+            logger.debug(f"Update download record info: {data}")
+
+        def _down_part(file) -> int:
+            offset = offsets[file.name]
+            seg = [offset, offset + info['sizes'][file.name]]
+            logger.debug(f"Download {file.name}, offset: {offset}")
+            code = self._down_range(durls[file.name], fd, seg, lock, task, base=offset)
+            if code == LanZouCloud.SUCCESS:
+                with lock:
+                    info['finished'].append(file.name)  # 一块数据写入完成
+            return code
+
+        _save_record()
+        fd = os.open(big_file, os.O_WRONLY | getattr(os, 'O_BINARY', 0))
+        ex = ThreadPoolExecutor(max_workers=max(min(self._dl_segments, len(pending)), 1))
+        tasks = [ex.submit(_down_part, f) for f in pending]
+        try:
+            self._wait_tasks(tasks, callback, _save_record)
+        finally:
+            ex.shutdown(wait=True)
+            os.close(fd)
+            _save_record()
+
+        for t in tasks:
+            code = t.result()
+            if code != LanZouCloud.SUCCESS:
+                return code
+        # 全部数据块下载完成, 记录文件可以删除
+        logger.debug(f"Delete download record file: {record_file}")
+        os.remove(record_file)
         return LanZouCloud.SUCCESS
 
     def down_dir_by_url(self, task: object, callback, parent_dir="") -> int:
@@ -1314,53 +1928,33 @@ class LanZouCloud(object):
         first_page = self._get(f_url)  # 文件分享页面(第一页)
         if not first_page:
             return ShareInfo(LanZouCloud.NETWORK_ERROR)
-        first_page = remove_notes(first_page.text)  # 去除网页里的注释
+        first_page = parser.strip_notes(first_page.text)  # 去除网页里的注释
         if '文件取消' in first_page or '文件不存在' in first_page:
             return ShareInfo(LanZouCloud.FILE_CANCELLED)
         if ('id="pwdload"' in first_page or 'id="passwddiv"' in first_page or "输入密码" in first_page):  # 文件设置了提取码时
             if len(pwd) == 0:
                 return ShareInfo(LanZouCloud.LACK_PASSWORD)
-            f_size = re.search(r'class="n_filesize">[^<0-9]*([\.0-9 MKBmkbGg]+)<', first_page)
-            f_size = f_size.group(1) if f_size else ""
-            f_time = re.search(r'class="n_file_infos">([-0-9 :月天小时分钟秒前]+)<', first_page)
-            f_time = f_time.group(1) if f_time else ""
-            f_desc = re.search(r'class="n_box_des">(.*)<', first_page)
-            f_desc = f_desc.group(1) if f_desc else ""
-            sign = re.search(r"sign=(\w+?)&", first_page).group(1)
+            page = parser.SHARE_PWD_PAGE.scan(first_page)
+            f_size, f_time, f_desc, sign = page['size'], page['time'], page['desc'], page['sign']
             post_data = {'action': 'downprocess', 'sign': sign, 'p': pwd}
-            link_info = self._post(self._host_url + '/ajaxm.php', post_data)  # 保存了重定向前的链接信息和文件名
+            link_info = self._post(self._host_url + '/ajaxm.php', post_data, retry='read')  # 保存了重定向前的链接信息和文件名
             second_page = self._get(f_url)  # 再次请求文件分享页面，可以看见文件名，时间，大小等信息(第二页)
             if not link_info or not second_page.text:
                 return ShareInfo(LanZouCloud.NETWORK_ERROR)
-            second_page = second_page.text
             link_info = link_info.json()
             if link_info["zt"] == 1:
                 f_name = link_info['inf'].replace("*", "_")
-                if not f_size:
-                    f_size = re.search(r'大小：(.+?)</div>', second_page)
-                    f_size = f_size.group(1) if f_size else ""
-                if not f_time:
-                    f_time = re.search(r'class="n_file_infos">(.+?)</span>', second_page)
-                    f_time = f_time.group(1) if f_time else ""
+                if not f_size or not f_time:
+                    page = parser.SHARE_PWD_SECOND_PAGE.scan(second_page.text)
+                    f_size, f_time = f_size or page['size'], f_time or page['time']
 
                 return ShareInfo(LanZouCloud.SUCCESS, name=f_name, url=f_url, pwd=pwd, desc=f_desc, time=f_time, size=f_size)
             else:
                 return ShareInfo(LanZouCloud.PASSWORD_ERROR)
         else:
-            f_name = re.search(r"<title>(.+?) - 蓝奏云</title>", first_page) or \
-                     re.search(r'<div class="filethetext".+?>([^<>]+?)</div>', first_page) or \
-                     re.search(r'<div style="font-size.+?>([^<>].+?)</div>', first_page) or \
-                     re.search(r"var filename = '(.+?)';", first_page) or \
-                     re.search(r'id="filenajax">(.+?)</div>', first_page) or \
-                     re.search(r'<div class="b"><span>([^<>]+?)</span></div>', first_page)
-            f_name = f_name.group(1) if f_name else "未匹配到文件名"
-
-            f_size = re.search(r'文件大小：</span>([\.0-9 MKBmkbGg]+)<br', first_page)
-            f_size = f_size.group(1) if f_size else ""
-            f_time = re.search(r'上传时间：</span>([-0-9 :月天小时分钟秒前]+)<br', first_page)
-            f_time = f_time.group(1) if f_time else ""
-            f_desc = re.search(r'文件描述：</span><br>([^<]+)</td>', first_page)
-            f_desc = f_desc.group(1).strip() if f_desc else ""
+            page = parser.SHARE_PAGE.scan(first_page)
+            f_name = page['name'] or "未匹配到文件名"
+            f_size, f_time, f_desc = page['size'], page['time'], page['desc'].strip()
             return ShareInfo(LanZouCloud.SUCCESS, name=f_name, url=f_url, pwd=pwd, desc=f_desc, time=f_time, size=f_size)
 
     def get_user_name(self):
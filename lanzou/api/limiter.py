@@ -0,0 +1,66 @@
+"""
+请求速率限制，避免请求过快触发蓝奏云的限流(acw_sc__v2 验证页面、验证码等)
+"""
+
+from threading import Lock
+from time import time, sleep
+
+
+__all__ = ['TokenBucket']
+
+
+class TokenBucket:
+    """令牌桶，每个请求消耗一个令牌，令牌以 rate 个/秒的速度补充，最多积累 burst 个
+    速率自适应(加性增、乘性减)：遇到限流时速率减半，并记住触发限流时的速率，
+    之后请求成功时缓慢提升速率，接近该速率时提升得更慢，使请求速率保持在限流阈值之下
+    """
+
+    def __init__(self, rate, burst, min_rate=0.5, step=0.05):
+        self._max_rate = rate  # 设定的最大速率(个/秒)，为 0 时不限速
+        self._rate = rate  # 当前速率
+        self._burst = burst
+        self._min_rate = min_rate
+        self._step = step  # 每次请求成功提升的速率
+        self._ceiling = rate  # 最近一次触发限流时的速率
+        self._tokens = burst
+        self._last = time()
+        self._lock = Lock()
+
+    @property
+    def rate(self):
+        return self._rate
+
+    def set_rate(self, rate, burst):
+        with self._lock:
+            self._max_rate = self._rate = self._ceiling = rate
+            self._burst = burst
+            self._tokens = min(self._tokens, burst)
+
+    def acquire(self):
+        """取得一个令牌，令牌不足时阻塞等待"""
+        with self._lock:
+            if self._max_rate <= 0:
+                return None
+            now = time()
+            self._tokens = min(self._burst, self._tokens + (now - self._last) * self._rate)
+            self._last = now
+            self._tokens -= 1  # 预先扣除令牌，多个线程按到达顺序排队
+            wait = -self._tokens / self._rate if self._tokens < 0 else 0
+        if wait > 0:
+            sleep(wait)
+
+    def on_success(self):
+        with self._lock:
+            if self._max_rate <= 0 or self._rate >= self._max_rate:
+                return None
+            step = self._step if self._rate < self._ceiling * 0.9 else self._step / 5
+            self._rate = min(self._max_rate, self._rate + step)
+
+    def on_throttled(self):
+        """遇到限流，速率减半，已积累的令牌作废"""
+        with self._lock:
+            if self._max_rate <= 0:
+                return None
+            self._ceiling = self._rate
+            self._rate = max(self._min_rate, self._rate / 2)
+            self._tokens = min(self._tokens, 0)
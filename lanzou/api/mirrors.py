@@ -0,0 +1,69 @@
+"""
+蓝奏云镜像域名的健康状态记录
+"""
+
+from threading import Lock
+from time import time
+
+
+__all__ = ['MirrorTracker']
+
+
+class MirrorTracker:
+    """记录各镜像域名的平均延迟与最近失败时间
+    请求优先发往延迟最低的可用域名，失败的域名排在最后，冷却 cooldown 秒后再探测
+    """
+
+    def __init__(self, domains, cooldown=60):
+        self._domains = list(domains)
+        self._cooldown = cooldown
+        self._latency = {}  # 平均延迟(秒) {domain: latency}
+        self._failed = {}  # 最近失败时间 {domain: time}
+        self._probing = set()  # 正在探测的域名
+        self._lock = Lock()
+
+    def domain_of(self, url):
+        """url 对应的镜像域名，不是镜像域名返回 None"""
+        for domain in self._domains:
+            if domain in url:
+                return domain
+        return None
+
+    def ordered(self) -> list:
+        """按健康状况排序的域名：可用域名按延迟升序(未测量的按原顺序)，失败域名按失败时间先后排在最后"""
+        with self._lock:
+            healthy = [d for d in self._domains if d not in self._failed]
+            healthy.sort(key=lambda d: (d not in self._latency, self._latency.get(d, 0)))
+            failed = sorted(self._failed, key=self._failed.get)
+        return healthy + failed
+
+    def report_ok(self, domain, latency=None):
+        with self._lock:
+            self._failed.pop(domain, None)
+            if latency is not None:
+                last = self._latency.get(domain)
+                # 指数加权平均，偶尔的慢请求不会让域名排序频繁变化
+                self._latency[domain] = latency if last is None else last * 0.7 + latency * 0.3
+
+    def report_fail(self, domain):
+        with self._lock:
+            self._failed[domain] = time()
+
+    def take_probes(self) -> list:
+        """取出需要探测的域名：冷却时间已过的失败域名，以及还没有测量过延迟的域名"""
+        now = time()
+        with self._lock:
+            domains = [d for d, t in self._failed.items() if now - t >= self._cooldown]
+            domains += [d for d in self._domains if d not in self._latency and d not in self._failed]
+            domains = [d for d in domains if d not in self._probing]
+            self._probing.update(domains)
+        return domains
+
+    def probe_done(self, domain, ok, latency=None):
+        """探测结束，ok 为 False 时重新开始冷却"""
+        with self._lock:
+            self._probing.discard(domain)
+        if ok:
+            self.report_ok(domain, latency)
+        else:
+            self.report_fail(domain)
@@ -0,0 +1,123 @@
+"""
+文件分享页面的解析，正则表达式在导入时编译，注释只在需要的区域删除
+"""
+
+import re
+
+
+__all__ = ['strip_notes', 'PageScanner', 'FILE_PAGE', 'FILE_PWD_PAGE', 'FILE_PWD_SECOND_PAGE', 'DOWN_PAGE',
+           'CAPTCHA_PAGE', 'SHARE_PAGE', 'SHARE_PWD_PAGE', 'SHARE_PWD_SECOND_PAGE', 'find_var']
+
+
+_HTML_NOTE = re.compile(r'<!--.+?-->|\s+//\s*.+')  # html 注释
+_JS_NOTE = re.compile(r'(.+?[,;])\s*//.+')  # js 注释
+_NOTE_OR_SCRIPT = re.compile(r'<!--.+?-->|(?s:<script[^>]*>.*?</script>)')
+
+
+def _strip_region(match) -> str:
+    text = match.group(0)
+    if text.startswith('<!--'):
+        return ''
+    text = _HTML_NOTE.sub('', text)
+    return _JS_NOTE.sub(r'\1', text)
+
+
+def strip_notes(html: str) -> str:
+    """删除网页的注释，与 remove_notes 相同，但 js 注释只在 <script> 内查找"""
+    return _NOTE_OR_SCRIPT.sub(_strip_region, html)
+
+
+class PageScanner:
+    """页面字段提取器
+    fields 为 {字段名: [正则, ...]}，同一字段的多个正则按顺序作为备选，取第一个匹配的结果
+    以普通字符开头的正则，re 模块会先快速查找开头的字符串再尝试匹配，
+    因此逐个 search 比把全部正则合并成一个分支正则扫描一遍更快
+    """
+
+    def __init__(self, fields: dict):
+        self._fields = {name: [re.compile(p) for p in patterns] for name, patterns in fields.items()}
+
+    def scan(self, html: str) -> dict:
+        """提取全部字段，没有匹配的字段为空字符串"""
+        result = {}
+        for name, patterns in self._fields.items():
+            result[name] = ''
+            for pattern in patterns:
+                m = pattern.search(html)
+                if m:
+                    result[name] = m.group(1)
+                    break
+        return result
+
+
+# get_file_info_by_url: 没有提取码的文件分享页面
+FILE_PAGE = PageScanner({
+    'name': [r"<title>(.+?) - 蓝奏云</title>",  # 文件名位置变化很多
+             r'<div class="filethetext".+?>([^<>]+?)</div>',
+             r'<div style="font-size.+?>([^<>].+?)</div>',
+             r"var filename = '(.+?)';",
+             r'id="filenajax">(.+?)</div>',
+             r'<div class="b"><span>([^<>]+?)</span></div>'],
+    'time': [r'>(\d+\s?[秒天分小][钟时]?前|[昨前]天\s?[\d:]+?|\d+\s?天前|\d{4}-\d\d-\d\d)<'],
+    'size': [r'大小.+?(\d[\d\.,]+\s?[BKM]?)<',
+             r'大小：(.+?)</div>'],  # VIP 分享页面
+    'desc': [r'文件描述.+?</span><br>\n?\s*(.*?)\s*</td>'],
+    'para': [r'<iframe.*?src="(.+?)"'],  # 下载页面 URL 的参数
+})
+
+# get_file_info_by_url: 有提取码的文件分享页面
+FILE_PWD_PAGE = PageScanner({
+    'sign': [r"sign=(\w+?)&"],
+})
+
+FILE_PWD_SECOND_PAGE = PageScanner({
+    'size': [r'大小.+?(\d[\d\.,]+\s?[BKM]?)<'],
+    'time': [r'class="n_file_infos">(.+?)</span>'],
+    'desc': [r'class="n_box_des">(.*?)</div>'],
+})
+
+# 下载页面(iframe)，一般情况 sign 的值就在 data 里，有时放在变量后面
+DOWN_PAGE = PageScanner({
+    'sign': [r"'sign':(.+?),"],
+    'ajaxdata': [r"var ajaxdata\s*=\s*'(.+?)';"],
+    'websign': [r"var websign\s*=\s*'(.+?)';"],
+    'websignkey': [r"var websignkey\s*=\s*'(.+?)';"],
+})
+
+# 遇到验证码的下载页面
+CAPTCHA_PAGE = PageScanner({
+    'file': [r"'file':'(.+?)'"],
+    'sign': [r"'sign':'(.+?)'"],
+})
+
+# get_share_info_by_url: 没有提取码的文件分享页面
+SHARE_PAGE = PageScanner({
+    'name': [r"<title>(.+?) - 蓝奏云</title>",
+             r'<div class="filethetext".+?>([^<>]+?)</div>',
+             r'<div style="font-size.+?>([^<>].+?)</div>',
+             r"var filename = '(.+?)';",
+             r'id="filenajax">(.+?)</div>',
+             r'<div class="b"><span>([^<>]+?)</span></div>'],
+    'size': [r'文件大小：</span>([\.0-9 MKBmkbGg]+)<br'],
+    'time': [r'上传时间：</span>([-0-9 :月天小时分钟秒前]+)<br'],
+    'desc': [r'文件描述：</span><br>([^<]+)</td>'],
+})
+
+# get_share_info_by_url: 有提取码的文件分享页面
+SHARE_PWD_PAGE = PageScanner({
+    'size': [r'class="n_filesize">[^<0-9]*([\.0-9 MKBmkbGg]+)<'],
+    'time': [r'class="n_file_infos">([-0-9 :月天小时分钟秒前]+)<'],
+    'desc': [r'class="n_box_des">(.*)<'],
+    'sign': [r"sign=(\w+?)&"],
+})
+
+SHARE_PWD_SECOND_PAGE = PageScanner({
+    'size': [r'大小：(.+?)</div>'],
+    'time': [r'class="n_file_infos">(.+?)</span>'],
+})
+
+
+def find_var(html: str, name: str) -> str:
+    """js 变量 name 的字符串值"""
+    value = re.search(rf"var {name}\s*=\s*'(.+?)';", html)
+    return value.group(1) if value else ''
@@ -14,8 +14,9 @@ from lanzou.debug import logger
 
 
 __all__ = ['remove_notes', 'name_format', 'time_format', 'is_name_valid', 'is_file_url',
-           'is_folder_url', 'big_file_split', 'un_serialize', 'let_me_upload', 'USER_AGENT',
-           'sum_files_size', 'convert_file_size_to_str', 'calc_acw_sc__v2']
+           'is_folder_url', 'big_file_plan', 'un_serialize', 'let_me_upload', 'USER_AGENT',
+           'sum_files_size', 'convert_file_size_to_str', 'calc_acw_sc__v2', 'is_acw_challenge', 'split_segments', 'write_at',
+           'FileSlice']
 
 
 USER_AGENT = 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10.15; rv:78.0) Gecko/20100101 Firefox/78.0'
@@ -165,16 +166,13 @@ def un_serialize(data: bytes):
         return None
 
 
-def big_file_split(file_path: str, max_size: int = 100, start_byte: int = 0) -> Tuple[int, str]:
+def big_file_plan(file_path: str, max_size: int = 100, start_byte: int = 0) -> list:
     """将大文件拆分为大小、格式随机的数据块, 可指定文件起始字节位置(用于续传)
-    :return 数据块文件的大小和绝对路径
+    只生成拆分方案，上传时直接从源文件读取对应区间
+    :return [[数据块文件名, 起始字节, 大小], ...]
     """
     file_name = os.path.basename(file_path)
     file_size = os.path.getsize(file_path)
-    tmp_dir = os.path.dirname(file_path) + os.sep + '__' + '.'.join(file_name.split('.')[:-1])
-
-    if not os.path.exists(tmp_dir):
-        os.makedirs(tmp_dir)
 
     def get_random_size() -> int:
         """按权重生成一个不超过 max_size 的文件大小"""
@@ -191,29 +189,83 @@ def big_file_split(file_path: str, max_size: int = 100, start_byte: int = 0) ->
         name = ''.join(name) + '.' + choice(suffix_list)
         return name_format(name)  # 确保随机名合法
 
-    with open(file_path, 'rb') as big_file:
-        big_file.seek(start_byte)
-        left_size = file_size - start_byte  # 大文件剩余大小
-        random_size = get_random_size()
-        tmp_file_size = random_size if left_size > random_size else left_size
-        tmp_file_path = tmp_dir + os.sep + get_random_name()
-
-        chunk_size = 524288  # 512KB
-        left_read_size = tmp_file_size
-        with open(tmp_file_path, 'wb') as small_file:
-            while left_read_size > 0:
-                if left_read_size < chunk_size:  # 不足读取一次
-                    small_file.write(big_file.read(left_read_size))
-                    break
-                # 一次读取一块,防止一次性读取占用内存
-                small_file.write(big_file.read(chunk_size))
-                left_read_size -= chunk_size
-
-    return tmp_file_size, tmp_file_path
-
-
-def let_me_upload(file_path):
-    """允许文件上传"""
+    plan = []
+    while start_byte < file_size:
+        size = min(get_random_size(), file_size - start_byte)
+        plan.append([get_random_name(), start_byte, size])
+        start_byte += size
+    return plan
+
+
+def split_segments(start: int, total: int, count: int, min_size: int) -> list:
+    """把 [start, total) 字节区间切分为不超过 count 段, 每段不小于 min_size
+    :return [[段起始字节, 段结束字节(不含)], ...]
+    """
+    left = total - start
+    count = max(1, min(count, left // max(min_size, 1)))
+    step = left // count
+    segments = []
+    for i in range(count):
+        begin = start + i * step
+        end = total if i == count - 1 else begin + step
+        segments.append([begin, end])
+    return segments
+
+
+def write_at(fd: int, data: bytes, offset: int, lock=None):
+    """在文件描述符 fd 的 offset 处写入数据，多线程写同一文件时互不干扰"""
+    view = memoryview(data)
+    if hasattr(os, 'pwrite'):
+        while view:
+            written = os.pwrite(fd, view, offset)
+            view = view[written:]
+            offset += written
+    else:  # Windows 没有 pwrite, 只能加锁 seek + write
+        with lock:
+            os.lseek(fd, offset, os.SEEK_SET)
+            while view:
+                written = os.write(fd, view)
+                view = view[written:]
+
+
+class FileSlice:
+    """源文件中 [start, start + size) 的只读视图，末尾可追加额外数据
+    提供 read 与 len(剩余字节数)，可直接交给 MultipartEncoder 流式读取，无需生成临时文件
+    """
+
+    def __init__(self, file_path, start=0, size=None, tail=b''):
+        self._file = open(file_path, 'rb')
+        self._file.seek(start)
+        if size is None:
+            size = os.path.getsize(file_path) - start
+        self._left = size  # 源文件剩余字节数
+        self._tail = tail
+
+    @property
+    def len(self):
+        return self._left + len(self._tail)
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = self.len
+        data = b''
+        if self._left > 0:
+            data = self._file.read(min(size, self._left))
+            self._left = self._left - len(data) if data else 0  # 源文件被截断时不再读取
+        if len(data) < size and self._tail:
+            extra = self._tail[:size - len(data)]
+            self._tail = self._tail[len(extra):]
+            data += extra
+        return data
+
+    def close(self):
+        self._file.close()
+
+
+def let_me_upload(file_path) -> Tuple[str, bytes]:
+    """允许文件上传
+    :return 伪装后的文件名和需要追加到文件尾部的 "报尾"
+    """
     file_size = os.path.getsize(file_path) / 1024 / 1024  # MB
     file_name = os.path.basename(file_path)
 
@@ -222,24 +274,14 @@ def let_me_upload(file_path):
     big_file_suffix = choice(big_file_suffix)
     small_file_suffix = choice(small_file_suffix)
     suffix = small_file_suffix if file_size < 30 else big_file_suffix
-    new_file_path = '.'.join(file_path.split('.')[:-1]) + '.' + suffix
-
-    with open(new_file_path, 'wb') as out_f:
-        # 写入原始文件数据
-        with open(file_path, 'rb') as in_f:
-            chunk = in_f.read(4096)
-            while chunk:
-                out_f.write(chunk)
-                chunk = in_f.read(4096)
-        # 构建文件 "报尾" 保存真实文件名,大小 512 字节
-        # 追加数据到文件尾部，并不会影响文件的使用，无需修改即可分享给其他人使用，自己下载时则会去除，确保数据无误
-        # protocol=4(py3.8默认), 序列化后空字典占 42 字节
-        padding = 512 - len(file_name.encode('utf-8')) - 42
-        data = {'name': file_name, 'padding': b'\x00' * padding}
-        data = pickle.dumps(data, protocol=4)
-        out_f.write(data)
-    return new_file_path
+    new_file_name = os.path.splitext(file_name)[0] + '.' + suffix
 
+    # 构建文件 "报尾" 保存真实文件名,大小 512 字节
+    # 追加数据到文件尾部，并不会影响文件的使用，无需修改即可分享给其他人使用，自己下载时则会去除，确保数据无误
+    # protocol=4(py3.8默认), 序列化后空字典占 42 字节
+    padding = 512 - len(file_name.encode('utf-8')) - 42
+    data = {'name': file_name, 'padding': b'\x00' * padding}
+    return new_file_name, pickle.dumps(data, protocol=4)
 
 
 def auto_rename(file_path) -> str:
@@ -255,6 +297,11 @@ def auto_rename(file_path) -> str:
     return fpath + os.sep + fname_no_ext + '(' + str(count) + ')' + ext
 
 
+def is_acw_challenge(html_text: str) -> bool:
+    """页面是否为 acw_sc__v2 验证页面(访问过多时返回，需要计算 cookie 后重新访问)"""
+    return "acw_sc__v2" in html_text and "arg1=" in html_text
+
+
 def calc_acw_sc__v2(html_text: str) -> str:
     arg1 = re.search(r"arg1='([0-9A-Z]+)'", html_text)
     arg1 = arg1.group(1) if arg1 else ""
@@ -263,28 +310,15 @@ def calc_acw_sc__v2(html_text: str) -> str:
 
 
 # 参考自 https://zhuanlan.zhihu.com/p/228507547
-def unsbox(str_arg):
-    v1 = [15, 35, 29, 24, 33, 16, 1, 38, 10, 9, 19, 31, 40, 27, 22, 23, 25, 13, 6, 11, 39, 18, 20, 8, 14, 21, 32, 26, 2,
-          30, 7, 4, 17, 5, 3, 28, 34, 37, 12, 36]
-    v2 = ["" for _ in v1]
-    for idx in range(0, len(str_arg)):
-        v3 = str_arg[idx]
-        for idx2 in range(len(v1)):
-            if v1[idx2] == idx + 1:
-                v2[idx2] = v3
+# 结果的第 i 个字符取自参数的第 _ACW_ORDER[i] 个字符
+_ACW_ORDER = [p - 1 for p in (15, 35, 29, 24, 33, 16, 1, 38, 10, 9, 19, 31, 40, 27, 22, 23, 25, 13, 6, 11, 39, 18,
+                              20, 8, 14, 21, 32, 26, 2, 30, 7, 4, 17, 5, 3, 28, 34, 37, 12, 36)]
+
 
-    res = ''.join(v2)
-    return res
+def unsbox(str_arg):
+    return ''.join(str_arg[p] for p in _ACW_ORDER if p < len(str_arg))
 
 
 def hex_xor(str_arg, args):
-    res = ''
-    for idx in range(0, min(len(str_arg), len(args)), 2):
-        v1 = int(str_arg[idx:idx + 2], 16)
-        v2 = int(args[idx:idx + 2], 16)
-        v3 = format(v1 ^ v2, 'x')
-        if len(v3) == 1:
-            v3 = '0' + v3
-        res += v3
-
-    return res
+    return ''.join('%02x' % (int(str_arg[idx:idx + 2], 16) ^ int(args[idx:idx + 2], 16))
+                   for idx in range(0, min(len(str_arg), len(args)), 2))
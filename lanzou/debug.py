@@ -9,7 +9,7 @@ import logging
 __all__ = ['logger']
 
 
-# 全局常量: USER_HOME, DL_DIR, SRC_DIR, BG_IMG, CONFIG_FILE
+# 全局常量: USER_HOME, DL_DIR, SRC_DIR, BG_IMG, CONFIG_FILE, CACHE_FILE
 USER_HOME = os.path.expanduser('~')
 if os.name == 'nt':  # Windows
     root_dir = os.path.dirname(os.path.abspath(__file__))
@@ -29,6 +29,7 @@ else:  # Linux and MacOS ...
 SRC_DIR = root_dir + os.sep + "src" + os.sep
 BG_IMG = (SRC_DIR + "default_background_img.jpg").replace('\\', '/')
 CONFIG_FILE = root_dir + os.sep + 'config.pkl'
+CACHE_FILE = root_dir + os.sep + 'cache.db'  # 文件(夹)列表缓存
 
 
 # 日志设置
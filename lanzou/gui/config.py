@@ -8,6 +8,7 @@ KEY = 152  # config 加密 key
 
 default_settings = {
     "download_threads": 3,     # 同时三个下载任务
+    "download_segments": 4,    # 单文件分段下载连接数
     "timeout": 5,              # 每个请求的超时 s(不包含下载响应体的用时)
     "max_size": 100,           # 单个文件大小上限 MB
     "dl_path": DL_DIR,
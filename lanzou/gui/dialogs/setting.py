@@ -16,6 +16,7 @@ class SettingDialog(QDialog):
         super(SettingDialog, self).__init__(parent)
         self._config = object
         self.download_threads = 3
+        self.download_segments = 4
         self.max_size = 100
         self.timeout = 5
         self.dl_path = None
@@ -47,6 +48,7 @@ class SettingDialog(QDialog):
     def show_values(self):
         """控件显示值"""
         self.download_threads_var.setText(str(self.download_threads))
+        self.download_segments_var.setText(str(self.download_segments))
         self.max_size_var.setText(str(self.max_size))
         self.timeout_var.setText(str(self.timeout))
         self.dl_path_var.setText(str(self.dl_path))
@@ -82,6 +84,8 @@ class SettingDialog(QDialog):
         self.set_desc = settings["set_desc"]
         self.desc = settings["desc"]
         self.upload_delay = settings["upload_delay"]
+        if 'download_segments' in settings:
+            self.download_segments = settings["download_segments"]
         if 'upgrade' in settings:
             self.upgrade = settings["upgrade"]
         if 'allow_big_file' in settings:
@@ -92,6 +96,8 @@ class SettingDialog(QDialog):
         """读取输入控件的值"""
         if self.download_threads_var.text():
             self.download_threads = int(self.download_threads_var.text())
+        if self.download_segments_var.text():
+            self.download_segments = int(self.download_segments_var.text())
         if self.max_size_var.text():
             self.max_size = int(self.max_size_var.text())
         if self.timeout_var.text():
@@ -102,6 +108,7 @@ class SettingDialog(QDialog):
         self.pwd = str(self.set_pwd_var.toPlainText())
         self.desc = str(self.set_desc_var.toPlainText())
         return {"download_threads": self.download_threads,
+                "download_segments": self.download_segments,
                 "max_size": self.max_size,
                 "timeout": self.timeout,
                 "dl_path": self.dl_path,
@@ -128,6 +135,11 @@ class SettingDialog(QDialog):
         self.download_threads_var.setPlaceholderText("范围：1-9")
         self.download_threads_var.setToolTip("范围：1-9")
         self.download_threads_var.setInputMask("D")
+        self.download_segments_lb = QLabel("单文件下载连接数")
+        self.download_segments_var = QLineEdit()
+        self.download_segments_var.setPlaceholderText("范围：1-9")
+        self.download_segments_var.setToolTip("范围：1-9，大文件分段并发下载，1 为单连接下载")
+        self.download_segments_var.setInputMask("D")
         self.max_size_lb = QLabel("分卷大小(MB)")
         self.max_size_var = QLineEdit()
         self.max_size_var.setPlaceholderText("普通用户最大100，vip用户根据具体情况设置")
@@ -191,6 +203,7 @@ class SettingDialog(QDialog):
         form.setFieldGrowthPolicy(QFormLayout.FieldGrowthPolicy.AllNonFixedFieldsGrow)  # 覆盖MacOS的默认样式
         form.setSpacing(10)
         form.addRow(self.download_threads_lb, self.download_threads_var)
+        form.addRow(self.download_segments_lb, self.download_segments_var)
         form.addRow(self.timeout_lb, self.timeout_var)
         form.addRow(self.upload_delay_lb, self.upload_delay_var)
         form.addRow(self.max_size_lb, self.max_size_var)
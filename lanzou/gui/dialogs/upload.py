@@ -2,7 +2,7 @@ import os
 from PyQt6.QtCore import Qt, pyqtSignal
 from PyQt6.QtGui import QIcon, QPixmap, QStandardItem, QStandardItemModel
 from PyQt6.QtWidgets import (QDialog, QLabel, QDialogButtonBox, QPushButton, QListView,
-                             QVBoxLayout, QHBoxLayout, QAbstractItemView, QFileDialog)
+                             QVBoxLayout, QHBoxLayout, QAbstractItemView, QFileDialog, QCheckBox)
 
 from lanzou.gui.qss import dialog_qss_style
 from lanzou.gui.others import MyListView
@@ -77,6 +77,10 @@ class UploadDialog(QDialog):
         self.btn_deleteSelect.setIcon(QIcon(SRC_DIR + "delete.ico"))
         self.btn_deleteSelect.setToolTip("按 Delete 移除选中文件")
 
+        # 递归上传
+        self.cb_recursive = QCheckBox("包含子文件夹", self)
+        self.cb_recursive.setToolTip("上传文件夹时按相同的目录结构上传子文件夹")
+
         # 列表
         self.list_view = MyListView()
         self.list_view.drop_files.connect(self.add_drop_files)
@@ -102,6 +106,7 @@ class UploadDialog(QDialog):
         hbox_head.addStretch(1)
         hbox_head.addWidget(self.btn_chooseMultiFile)
         hbox_button.addWidget(self.btn_deleteSelect)
+        hbox_button.addWidget(self.cb_recursive)
         hbox_button.addStretch(1)
         hbox_button.addWidget(self.buttonBox)
         vbox.addWidget(self.logo)
@@ -153,6 +158,7 @@ class UploadDialog(QDialog):
     def backslash(self):
         """Windows backslash"""
         tasks = {}
+        recursive = self.cb_recursive.isChecked()
         for item in self.selected:
             url = os.path.normpath(item)
             total_size = 0
@@ -163,19 +169,20 @@ class UploadDialog(QDialog):
                     continue  # 空文件无法上传
                 total_file += 1
             else:
-                for filename in os.listdir(url):
-                    file_path = os.path.join(url, filename)
-                    if not os.path.isfile(file_path):
-                        continue  # 跳过子文件夹
-                    total_size += os.path.getsize(file_path)
-                    total_file += 1
+                for root, _, filenames in os.walk(url):
+                    for filename in filenames:
+                        total_size += os.path.getsize(os.path.join(root, filename))
+                        total_file += 1
+                    if not recursive:
+                        break  # 跳过子文件夹
             tasks[url] = UpJob(url=url,
                                fid=self._folder_id,
                                folder=self._folder_name,
                                pwd=self.pwd if self.set_pwd else None,
                                desc=self.desc if self.set_desc else None,
                                total_size=total_size,
-                               total_file=total_file)
+                               total_file=total_file,
+                               recursive=recursive and os.path.isdir(url))
         return tasks
 
     def slot_btn_ok(self):
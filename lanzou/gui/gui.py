@@ -24,7 +24,7 @@ from lanzou.gui.workers.manager import change_size_unit
 from lanzou.gui.dialogs import *
 from lanzou.gui.qss import *
 from lanzou.gui import version
-from lanzou.debug import logger, USER_HOME, SRC_DIR
+from lanzou.debug import logger, USER_HOME, SRC_DIR, CACHE_FILE
 
 
 __ALL__ = ['MainWindow']
@@ -119,6 +119,7 @@ class MainWindow(Ui_MainWindow):
 
     def init_variables(self):
         self._disk = LanZouCloud()
+        self._disk.set_list_cache(CACHE_FILE)
         self._config = config
         self._user = None    # 当前登录用户名
         self._folder_list = {}  # disk 工作目录文件夹
@@ -165,6 +166,12 @@ class MainWindow(Ui_MainWindow):
         self._disk.set_timeout(settings["timeout"])
         self._disk.set_max_size(settings["max_size"])
         self.task_manager.set_thread(settings["download_threads"])  # 同时下载任务数量
+        self._disk.set_upload_threads(settings["download_threads"])  # 批量上传文件夹时同时上传的文件数
+        if 'download_segments' in settings:
+            self._disk.set_download_segments(settings["download_segments"])  # 单文件分段下载连接数
+        # 连接池要容纳所有下载线程的分段连接，另外留一些给列表刷新等请求
+        segments = settings["download_segments"] if 'download_segments' in settings else 4
+        self._disk.set_pool_size(settings["download_threads"] * max(segments, 1) + 8)
         self.share_set_dl_path.setText(self._config.path)  # 提取界面下载路径
         self.time_fmt = settings["time_fmt"]  # 时间显示格式
         self._to_tray = settings["to_tray"]
@@ -1016,7 +1023,21 @@ class MainWindow(Ui_MainWindow):
                 time = QStandardItem(time_format(item.time)) if self.time_fmt else QStandardItem(item.time)
                 self.model_share.appendRow([name, size, time])
 
+    def show_share_url_files_batch(self, files):
+        """文件夹信息获取完成前，先逐页追加文件，完成后由 show_share_url_file_lists 重新展示"""
+        for item in files:
+            name = QStandardItem(set_file_icon(item.name), item.name)
+            size = QStandardItem(item.size)
+            size.setData(format_size_int(item.size), Qt.ItemDataRole.UserRole)
+            time = QStandardItem(time_format(item.time)) if self.time_fmt else QStandardItem(item.time)
+            size.setTextAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+            time.setTextAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+            self.model_share.appendRow([name, size, time])
+        self.model_share.setHorizontalHeaderLabels([f"正在获取…… 已获取文件{self.model_share.rowCount()}个", "大小", "时间"])
+
     def show_share_url_file_lists(self, infos):
+        if isinstance(infos, FolderDetail):
+            self.model_share.removeRows(0, self.model_share.rowCount())  # 清除逐页展示的文件
         if infos.code == LanZouCloud.SUCCESS:
             if isinstance(infos, FolderDetail):  # 文件夹 FolderDetail -> code, folder, files, sub_folders
                 self.show_share_folder_url_lists(infos)
@@ -1108,6 +1129,7 @@ class MainWindow(Ui_MainWindow):
         self.get_shared_info_thread.msg.connect(self.show_status)  # 提示信息
         self.get_shared_info_thread.infos.connect(self.show_share_url_judge_folder)  # 判断是否包含子文件夹
         self.get_shared_info_thread.infos.connect(self.show_share_url_file_lists)  # 内容信息
+        self.get_shared_info_thread.files.connect(self.show_share_url_files_batch)  # 逐页展示文件
         self.get_shared_info_thread.update.connect(lambda: self.btn_extract.setEnabled(True))
         self.get_shared_info_thread.update.connect(lambda: self.line_share_url.setEnabled(True))
         self.get_shared_info_thread.update.connect(lambda: self.line_share_pwd.setEnabled(True))
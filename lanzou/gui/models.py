@@ -141,7 +141,7 @@ class DlJob(Job):
 
 
 class UpJob(Job):
-    def __init__(self, url, fid, folder, pwd=None, desc=None, total_size=0, total_file=1):
+    def __init__(self, url, fid, folder, pwd=None, desc=None, total_size=0, total_file=1, recursive=False):
         super(UpJob, self).__init__(url, 'up')
         self._fid = fid
         self._folder = folder
@@ -149,6 +149,7 @@ class UpJob(Job):
         self._desc = desc
         self._total_size = total_size
         self._total_file = total_file
+        self._recursive = recursive
 
     @property
     def fid(self):
@@ -170,6 +171,10 @@ class UpJob(Job):
     def desc(self):
         return self._desc
 
+    @property
+    def recursive(self):
+        return self._recursive
+
 
 class Tasks(object):
     def __init__(self):
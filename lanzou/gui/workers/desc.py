@@ -1,3 +1,4 @@
+from time import time
 from PyQt6.QtCore import QThread, pyqtSignal, QMutex
 from lanzou.api import LanZouCloud
 
@@ -46,23 +47,39 @@ class DescPwdFetcher(QThread):
                     raise UserWarning
                 _tasks = {}
                 _infos = []
+                last_emit = time()
+
+                def _add(info):
+                    nonlocal _tasks, last_emit
+                    _infos.append(info)  # info -> lanzou.gui.models.FileInfos
+                    _tasks[info.url] = DlJob(infos=info, path=self.dl_path, total_file=1)
+                    # 下载时分批发送任务，不必等待全部信息获取完成
+                    if self.download and (len(_tasks) >= 20 or time() - last_emit > 0.5):
+                        self.tasks.emit(_tasks)
+                        _tasks = {}
+                        last_emit = time()
+
+                pending = {}  # 需要从网盘获取分享信息的 {(id, is_file): info}
                 for info in self.infos:
                     if info.id:  # disk 运行
-                        if info.is_file:  # 文件
-                            res = self._disk.get_share_info(info.id, is_file=True)
-                        else:  # 文件夹
-                            res = self._disk.get_share_info(info.id, is_file=False)
-                        if res.code == LanZouCloud.SUCCESS:
-                            info.pwd = res.pwd
-                            info.url = res.url
+                        pending[(info.id, info.is_file)] = info
+                    else:
+                        _add(info)
+                fields = ('url', 'pwd') if self.download else None  # 下载只需要链接与提取码
+                for key, res in self._disk.iter_share_info(list(pending), fields):
+                    info = pending[key]
+                    if res.code == LanZouCloud.SUCCESS:
+                        info.pwd = res.pwd
+                        info.url = res.url
+                        if not self.download:
                             info.desc = res.desc
-                        elif res.code == LanZouCloud.NETWORK_ERROR:
-                            self.msg.emit("网络错误，请稍后重试！", 6000)
-                            continue
-                    _infos.append(info)  # info -> lanzou.gui.models.FileInfos
-                    _tasks[info.url] = DlJob(infos=info, path=self.dl_path, total_file=1)
+                    elif res.code == LanZouCloud.NETWORK_ERROR:
+                        self.msg.emit("网络错误，请稍后重试！", 6000)
+                        continue
+                    _add(info)
                 if self.download:
-                    self.tasks.emit(_tasks)
+                    if _tasks:
+                        self.tasks.emit(_tasks)
                 else:  # 激发简介更新
                     self.desc.emit(_infos)
             except TimeoutError:
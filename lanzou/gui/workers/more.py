@@ -53,8 +53,11 @@ class GetMoreInfoWorker(QThread):
                     if isinstance(self._infos, Infos):
                         if self._infos.id:  # 从 disk 运行
                             self.msg.emit("网络请求中，请稍候……", 0)
-                            _info = self._disk.get_share_info(self._infos.id, is_file=self._infos.is_file)
-                            self._infos.desc = _info.desc
+                            fields = ('url', 'pwd') if self._emit_link else None  # 复制链接只需要链接与提取码
+                            _info = self._disk.get_share_info(self._infos.id, is_file=self._infos.is_file,
+                                                              fields=fields)
+                            if not self._emit_link:
+                                self._infos.desc = _info.desc
                             self._infos.pwd = _info.pwd
                             self._infos.url = _info.url
                         if self._emit_link:
@@ -38,6 +38,24 @@ class ListRefresher(QThread):
         self._is_work = False
         self._mutex.unlock()
 
+    def _cached_infos(self):
+        """从本地缓存读取目录信息，缺少任意一项时返回空字典"""
+        infos = {}
+        if self.r_files:
+            file_list = self._disk.get_cached_file_list(self._fid)
+            if file_list is None:
+                return {}
+            info = {i.name: i for i in file_list}
+            infos['file_list'] = {key: info.get(key) for key in sorted(info.keys())}
+        if self.r_folders:
+            dir_list = self._disk.get_cached_dir_list(self._fid)
+            if dir_list is None:
+                return {}
+            info = {i.name: i for i in dir_list[0]}
+            infos['folder_list'] = {key: info.get(key) for key in sorted(info.keys())}
+            infos['path_list'] = dir_list[1]
+        return infos
+
     def goto_root_dir(self):
         self._fid = -1
         self.run()
@@ -49,6 +67,10 @@ class ListRefresher(QThread):
             emit_infos = {}
             # 传递更新内容
             emit_infos['r'] = {'fid': self._fid, 'files': self.r_files, 'folders': self.r_folders, 'path': self.r_path}
+            cached_infos = self._cached_infos()
+            if cached_infos:  # 先显示缓存，再从网盘获取最新数据
+                cached_infos['r'] = emit_infos['r']
+                self.infos.emit(cached_infos)
             try:
                 if self.r_files:
                     # [i.id, i.name, i.size, i.time, i.downs, i.has_pwd, i.has_des]
@@ -70,6 +92,7 @@ class ListRefresher(QThread):
                 self.err_msg.emit("未知错误，无法更新目录，稍后再试！", 7000)
                 logger.error(f"ListRefresher error: e={e}")
             else:
-                self.infos.emit(emit_infos)
+                if emit_infos != cached_infos:  # 与缓存一致时无需重复刷新界面
+                    self.infos.emit(emit_infos)
             self._is_work = False
             self._mutex.unlock()
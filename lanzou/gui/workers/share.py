@@ -9,6 +9,7 @@ from lanzou.debug import logger
 class GetSharedInfo(QThread):
     '''提取界面获取分享链接信息'''
     infos = pyqtSignal(object)
+    files = pyqtSignal(object)  # 分享文件夹中陆续获取的文件，全部获取后仍由 infos 发送完整信息
     msg = pyqtSignal(str, int)
     update = pyqtSignal()
     clean = pyqtSignal()
@@ -87,6 +88,11 @@ class GetSharedInfo(QThread):
         else:
             self.msg.emit(f"<font color='red'>未知错误 code={infos.code}！</font>", show_time * 4)
 
+    def _emit_files(self, folder_url, files):
+        """只提前展示分享文件夹本身的文件"""
+        if folder_url == self.share_url:
+            self.files.emit(files)
+
     def run(self):
         if not self._is_work:
             self._mutex.lock()
@@ -97,7 +103,7 @@ class GetSharedInfo(QThread):
                     self.emit_msg(_infos)
                     self.infos.emit(_infos)
                 elif self.is_folder:  # 链接为文件夹
-                    _infos = self._disk.get_folder_info_by_url(self.share_url, self.pwd)
+                    _infos = self._disk.get_folder_info_by_url(self.share_url, self.pwd, callback=self._emit_files)
                     self.emit_msg(_infos)
                     self.infos.emit(_infos)
                 else:
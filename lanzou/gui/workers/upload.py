@@ -43,7 +43,8 @@ class Uploader(QThread):
         self._task.run = True
         try:
             if os.path.isdir(self._task.url):
-                code, fid, isfile = self._disk.upload_dir(self._task, self._callback, self._allow_big_file)
+                code, fid, isfile = self._disk.upload_dir(self._task, self._callback, self._allow_big_file,
+                                                          self._task.recursive)
             else:
                 code, fid, isfile = self._disk.upload_file(self._task, self._task.url, self._task.fid,
                                                            self._callback, self._allow_big_file)